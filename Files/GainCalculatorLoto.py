@@ -25,6 +25,7 @@ import random
 import os
 import sys
 import ast
+from profils import appliquer_profil
 
 # -----------------------------------------
 # 1. Définir les gains possibles (12 combinaisons)
@@ -64,6 +65,7 @@ def lister_bases_donnees():
 # -----------------------------------------
 def scanner_base_donnees(nom_bdd):
     conn = sqlite3.connect(nom_bdd)
+    appliquer_profil(conn, "read")
     cursor = conn.cursor()
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
     tables = [row[0] for row in cursor.fetchall()]
@@ -114,19 +116,32 @@ def ajouter_etoiles_si_absentes(conn, table):
 def calculer_gains_combinaisons(conn_source, table, numero_gagnant, gains_possibles):
     cursor = conn_source.cursor()
     ajouter_etoiles_si_absentes(conn_source, table)
-    cursor.execute(f"SELECT id, boules, etoiles FROM {table}")
-    rows = cursor.fetchall()
+    cursor.execute(f"PRAGMA table_info({table})")
+    colonnes = [col[1] for col in cursor.fetchall()]
+    colonnes_typees = "boule1" in colonnes
+    if colonnes_typees:
+        # boules en colonnes INTEGER => tuples directement depuis SQLite
+        cursor.execute(f"SELECT id, boule1, boule2, boule3, boule4, boule5, etoiles FROM {table}")
+        rows = [(r[0], tuple(r[1:6]), r[6]) for r in cursor.fetchall()]
+    else:
+        cursor.execute(f"SELECT id, boules, etoiles FROM {table}")
+        rows = cursor.fetchall()
     print(f"[DEBUG] Nombre de lignes extraites de {table} : {len(rows)}")
     boules_gagnantes = numero_gagnant["boules"]
     etoiles_gagnantes = numero_gagnant["etoiles"]
     resultats = []
     for row in rows:
-        id_comb, boules_str, etoiles_str = row
-        try:
-            boules = ast.literal_eval(boules_str)
-        except:
-            print(f"[DEBUG] Ligne ignorée (boules non valide) : {boules_str}")
-            continue
+        id_comb, boules_val, etoiles_str = row
+        if colonnes_typees:
+            boules = boules_val
+            boules_str = str(boules)
+        else:
+            boules_str = boules_val
+            try:
+                boules = ast.literal_eval(boules_str)
+            except:
+                print(f"[DEBUG] Ligne ignorée (boules non valide) : {boules_str}")
+                continue
         try:
             etoiles = ast.literal_eval(etoiles_str)
             if isinstance(etoiles, int):
@@ -391,6 +406,7 @@ def main():
 
     # Connexion à la base source et vérification de la colonne 'etoiles'
     conn_source = sqlite3.connect(nom_bdd)
+    appliquer_profil(conn_source, "read")
     ajouter_etoiles_si_necessaire(conn_source, table)
 
     # Calculer les gains pour chaque tirage de la table source
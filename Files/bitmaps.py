@@ -0,0 +1,189 @@
+# bitmaps.py
+"""
+Résultats de filtres sous forme de bitmaps sur l'univers des 1 906 884 combinaisons.
+
+Un bitmap = vecteur numpy uint8 de ceil(N/8) octets (~238 Ko), bit i = rang i
+(ordre "little" : le rang 0 est le bit de poids faible du premier octet).
+
+Opérations : ET / OU / NON, popcount, compteur "bit-slice" pour savoir
+quelles combinaisons passent au moins k filtres sans aucune requête SQL.
+
+Persistance : un fichier brut par filtre dans '<base>.db.bitmaps/', plus
+'presence.bin' (rangs présents dans Combinaisons_Filtrees) écrit à la génération.
+Sans presence.bin, les bitmaps de la base ne sont pas considérés comme complets.
+"""
+
+import os
+import shutil
+import numpy as np
+from ranking import NB_COMBINAISONS
+
+NB_OCTETS = (NB_COMBINAISONS + 7) // 8
+# bits au-delà de NB_COMBINAISONS dans le dernier octet
+_MASQUE_FIN = np.uint8((1 << (NB_COMBINAISONS - 8*(NB_OCTETS-1))) - 1)
+
+# ---------------------------------------------------------------------
+# Construction / conversion
+# ---------------------------------------------------------------------
+
+def bitmap_vide():
+    return np.zeros(NB_OCTETS, dtype=np.uint8)
+
+def bitmap_plein():
+    bm = np.full(NB_OCTETS, 0xFF, dtype=np.uint8)
+    bm[-1] &= _MASQUE_FIN
+    return bm
+
+def bitmap_depuis_bool(vect):
+    """
+    Vecteur booléen de longueur NB_COMBINAISONS => bitmap.
+    """
+    return np.packbits(np.asarray(vect, dtype=bool), bitorder="little")
+
+def bitmap_vers_bool(bm):
+    return np.unpackbits(bm, count=NB_COMBINAISONS, bitorder="little").astype(bool)
+
+def bitmap_depuis_rangs(rangs, vals=None, base=None):
+    """
+    Met à 1 (ou à vals[i]) le bit de chaque rang. Les autres bits
+    viennent de 'base' (ou 0).
+    """
+    vect = bitmap_vers_bool(base) if base is not None else np.zeros(NB_COMBINAISONS, dtype=bool)
+    rangs = np.asarray(rangs, dtype=np.int64)
+    vect[rangs] = True if vals is None else np.asarray(vals).astype(bool)
+    return bitmap_depuis_bool(vect)
+
+def rangs_depuis_bitmap(bm):
+    return np.nonzero(bitmap_vers_bool(bm))[0]
+
+# ---------------------------------------------------------------------
+# Algèbre
+# ---------------------------------------------------------------------
+
+def bitmap_et(*bms):
+    res = bms[0].copy()
+    for bm in bms[1:]:
+        np.bitwise_and(res, bm, out=res)
+    return res
+
+def bitmap_ou(*bms):
+    res = bms[0].copy()
+    for bm in bms[1:]:
+        np.bitwise_or(res, bm, out=res)
+    return res
+
+def bitmap_non(bm):
+    res = np.bitwise_not(bm)
+    res[-1] &= _MASQUE_FIN
+    return res
+
+def bitmap_compte(bm):
+    return int(np.unpackbits(bm).sum(dtype=np.int64))
+
+def compteur_bit_slice(bitmaps):
+    """
+    Additionne des bitmaps bit à bit : renvoie les plans [b0, b1, b2, ...]
+    tels que le nombre de filtres passés par le rang i = somme(plan_j[i] << j).
+    """
+    nb_plans = max(1, len(bitmaps).bit_length())
+    plans = [bitmap_vide() for _ in range(nb_plans)]
+    for bm in bitmaps:
+        retenue = bm
+        for j in range(nb_plans):
+            somme = np.bitwise_xor(plans[j], retenue)
+            retenue = np.bitwise_and(plans[j], retenue)
+            plans[j] = somme
+            if not retenue.any():
+                break
+    return plans
+
+def au_moins_k(bitmaps, k):
+    """
+    Bitmap des rangs qui passent au moins k des bitmaps donnés
+    (comparaison bit-slice du compteur avec k, du bit de poids fort au plus faible).
+    """
+    if k <= 0:
+        return bitmap_plein()
+    if k > len(bitmaps):
+        return bitmap_vide()
+    plans = compteur_bit_slice(bitmaps)
+    sup = bitmap_vide()
+    egal = bitmap_plein()
+    for j in range(len(plans)-1, -1, -1):
+        if (k >> j) & 1:
+            egal = bitmap_et(egal, plans[j])
+        else:
+            sup = bitmap_ou(sup, bitmap_et(egal, plans[j]))
+            egal = bitmap_et(egal, bitmap_non(plans[j]))
+    return bitmap_ou(sup, egal)
+
+# ---------------------------------------------------------------------
+# Persistance
+# ---------------------------------------------------------------------
+
+def sauver_bitmap(chemin, bm):
+    tmp = chemin + ".tmp"
+    bm.tofile(tmp)
+    os.replace(tmp, chemin)
+
+def charger_bitmap(chemin):
+    bm = np.fromfile(chemin, dtype=np.uint8)
+    if len(bm) != NB_OCTETS:
+        raise ValueError(f"Bitmap invalide : {chemin}")
+    return bm
+
+def dossier_bitmaps(conn):
+    """
+    '<fichier base>.bitmaps' pour la base principale de 'conn' (None en mémoire).
+    """
+    for _, nom, fichier in conn.execute("PRAGMA database_list").fetchall():
+        if nom == "main":
+            return fichier + ".bitmaps" if fichier else None
+    return None
+
+def reinitialiser_bitmaps(conn, presence):
+    """
+    Appelé à la génération : repart d'un dossier vide avec le bitmap de présence.
+    """
+    dossier = dossier_bitmaps(conn)
+    if dossier is None:
+        return
+    if os.path.isdir(dossier):
+        shutil.rmtree(dossier)
+    os.makedirs(dossier)
+    sauver_bitmap(os.path.join(dossier, "presence.bin"), presence)
+
+def maj_bitmap_filtre(conn, nom, rangs, vals):
+    """
+    Reporte les résultats (rangs, 0/1) d'un filtre dans son bitmap persistant.
+    """
+    dossier = dossier_bitmaps(conn)
+    if dossier is None or not os.path.exists(os.path.join(dossier, "presence.bin")):
+        return
+    chemin = os.path.join(dossier, f"filtre_{nom}.bin")
+    base = charger_bitmap(chemin) if os.path.exists(chemin) else None
+    sauver_bitmap(chemin, bitmap_depuis_rangs(rangs, vals, base))
+
+def remplacer_bitmap_filtre(conn, nom, rangs):
+    """
+    Le bitmap persistant du filtre devient exactement 'rangs' (rangs qui passent).
+    """
+    dossier = dossier_bitmaps(conn)
+    if dossier is None or not os.path.exists(os.path.join(dossier, "presence.bin")):
+        return
+    sauver_bitmap(os.path.join(dossier, f"filtre_{nom}.bin"), bitmap_depuis_rangs(rangs))
+
+def charger_bitmaps_filtres(conn, noms):
+    """
+    Renvoie (presence, {nom: bitmap}) ou None si la base n'a pas de bitmaps complets.
+    Un filtre jamais appliqué vaut 0 partout, comme sa colonne en base.
+    """
+    dossier = dossier_bitmaps(conn)
+    if dossier is None or not os.path.exists(os.path.join(dossier, "presence.bin")):
+        return None
+    presence = charger_bitmap(os.path.join(dossier, "presence.bin"))
+    res = {}
+    for nom in noms:
+        chemin = os.path.join(dossier, f"filtre_{nom}.bin")
+        res[nom] = charger_bitmap(chemin) if os.path.exists(chemin) else bitmap_vide()
+    return presence, res
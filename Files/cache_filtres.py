@@ -0,0 +1,166 @@
+# cache_filtres.py
+"""
+Cache persistant des résultats de filtres sur l'univers des 1 906 884 combinaisons.
+
+Un filtre ne dépend que de la combinaison et de ses seuils dans config.py
+(et de l'historique pour mps / comparatif) : son résultat est un bitmap
+indexé par le rang (bitmaps.py), valable pour toute base.
+
+Fichier : CACHE_DIR/<filtre>_<empreinte>.bin, empreinte = hash des paramètres.
+Un seuil modifié => nouvelle empreinte => seul ce filtre est recalculé.
+Éviction LRU (date de dernier accès = mtime) au-delà de CACHE_TAILLE_MAX octets.
+Un filtre absent du cache est évalué sur l'univers par tranches de rangs,
+réparties sur un pool de NB_WORKERS processus.
+"""
+
+import os
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import config
+from ranking import NB_COMBINAISONS
+from filters import evaluer_filtre_batch, mps_histogramme
+from univers import lot_tranche
+from bitmaps import (
+    NB_OCTETS,
+    bitmap_depuis_bool,
+    sauver_bitmap,
+    charger_bitmap
+)
+
+logger = logging.getLogger(__name__)
+
+# à incrémenter si le calcul d'un filtre change à paramètres égaux
+VERSION_CACHE = 1
+
+# constantes de config.py dont dépend chaque filtre
+PARAMETRES_FILTRES = {
+    "somme":                   ["SOMME_MIN", "SOMME_MAX"],
+    "dizaines":                ["DIZAINES_MAX"],
+    "suite":                   ["SUITE_MAX"],
+    "mediane":                 ["MEDIAN_MIN", "MEDIAN_MAX"],
+    "variance":                ["VARIANCE_MIN", "VARIANCE_MAX"],
+    "ecart":                   ["ECART_MIN", "ECART_MAX"],
+    "ecart_consecutif":        ["ECART_CONSECUTIF"],
+    "quartileshift_testborne": ["QSHIFT_TESTBORNE_BOUNDS", "QSHIFT_TESTBORNE_SCORE_95"],
+    "mps":                     ["MPS_MIN", "MPS_MAX"],
+    "somme3f":                 ["SOMME3F_MIN", "SOMME3F_MAX"],
+    "somme3c":                 ["SOMME3C_MIN", "SOMME3C_MAX"],
+    "somme3l":                 ["SOMME3L_MIN", "SOMME3L_MAX"],
+    "comparatif":              []
+}
+
+def empreinte_filtre(nom, historique=None):
+    """
+    Hash des paramètres du filtre (+ historique utile pour mps / comparatif).
+    """
+    h = hashlib.sha1()
+    h.update(f"v{VERSION_CACHE}|{nom}".encode())
+    for cst in PARAMETRES_FILTRES[nom]:
+        h.update(f"|{cst}={getattr(config, cst)!r}".encode())
+    if nom=="mps":
+        h.update(np.asarray(list(historique), dtype=np.uint64).tobytes())
+    elif nom=="comparatif":
+        last10 = historique[-10:] if len(historique)>=10 else []
+        h.update(np.asarray(list(last10), dtype=np.uint64).tobytes())
+    return h.hexdigest()[:16]
+
+def _chemin(nom, historique):
+    return os.path.join(config.CACHE_DIR, f"{nom}_{empreinte_filtre(nom, historique)}.bin")
+
+def charger_resultat(nom, historique=None):
+    """
+    Bitmap en cache pour ce filtre et ces paramètres, ou None.
+    """
+    chemin = _chemin(nom, historique)
+    if not os.path.exists(chemin):
+        return None
+    try:
+        bm = charger_bitmap(chemin)
+    except ValueError:
+        os.remove(chemin)
+        return None
+    os.utime(chemin)   # accès => le plus récent pour l'éviction
+    return bm
+
+def sauver_resultat(nom, historique, bm):
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    sauver_bitmap(_chemin(nom, historique), bm)
+    evincer()
+
+def evincer(taille_max=None):
+    """
+    Supprime les entrées les moins récemment utilisées au-delà de taille_max octets.
+    """
+    if taille_max is None:
+        taille_max = config.CACHE_TAILLE_MAX
+    if not os.path.isdir(config.CACHE_DIR):
+        return
+    entrees = []
+    for f in os.listdir(config.CACHE_DIR):
+        if f.endswith(".bin"):
+            chemin = os.path.join(config.CACHE_DIR, f)
+            st = os.stat(chemin)
+            entrees.append((st.st_mtime, st.st_size, chemin))
+    total = sum(e[1] for e in entrees)
+    for _, taille, chemin in sorted(entrees):
+        if total <= taille_max:
+            break
+        os.remove(chemin)
+        total -= taille
+        logger.info(f"Cache filtres : {os.path.basename(chemin)} évincé.")
+
+def _evaluer_tranche(args):
+    """
+    Tâche d'un processus : filtre évalué sur les rangs [debut, fin) => vecteur booléen.
+    """
+    nom, debut, fin, historique, freq = args
+    arr, masks = lot_tranche(debut, fin)
+    return np.asarray(evaluer_filtre_batch(nom, arr, masks, historique, freq=freq), dtype=bool)
+
+def calculer_resultat(nom, historique=None, chunk_size=None, nb_workers=None):
+    """
+    Évalue le filtre sur tout l'univers (rangs 0..N-1, par tranches) => bitmap.
+    Les tranches sont lues dans l'univers binaire s'il existe (univers.py) ;
+    avec nb_workers > 1 (défaut NB_WORKERS), elles sont évaluées par un pool de processus.
+    """
+    if chunk_size is None:
+        chunk_size = config.CHUNK_SIZE_SCAN
+    if nb_workers is None:
+        nb_workers = config.NB_WORKERS
+    historique = list(historique or [])
+    freq = mps_histogramme(historique) if nom=="mps" else None
+    taches = [(nom, debut, min(debut+chunk_size, NB_COMBINAISONS), historique, freq)
+              for debut in range(0, NB_COMBINAISONS, chunk_size)]
+    if nb_workers > 1:
+        with ProcessPoolExecutor(max_workers=nb_workers) as pool:
+            morceaux = list(pool.map(_evaluer_tranche, taches))
+    else:
+        morceaux = [_evaluer_tranche(t) for t in taches]
+    return bitmap_depuis_bool(np.concatenate(morceaux))
+
+def resultat_filtre(nom, historique=None):
+    """
+    Bitmap du filtre sur l'univers : depuis le cache si les paramètres
+    n'ont pas changé, sinon calculé puis mis en cache.
+    Renvoie (bitmap, trouve_en_cache).
+    """
+    historique = list(historique or [])
+    bm = charger_resultat(nom, historique)
+    if bm is not None:
+        return bm, True
+    bm = calculer_resultat(nom, historique)
+    sauver_resultat(nom, historique, bm)
+    return bm, False
+
+def taille_cache():
+    if not os.path.isdir(config.CACHE_DIR):
+        return 0
+    return sum(os.path.getsize(os.path.join(config.CACHE_DIR, f))
+               for f in os.listdir(config.CACHE_DIR) if f.endswith(".bin"))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    print(f"Cache : {config.CACHE_DIR} ({taille_cache()/1e6:.1f} Mo / "
+          f"{config.CACHE_TAILLE_MAX/1e6:.0f} Mo, {NB_OCTETS} octets par entrée)")
@@ -0,0 +1,186 @@
+# comptage.py
+"""
+Nombre exact de combinaisons qui passent les filtres de type somme
+(somme, somme3f, somme3c, somme3l) et quartileshift_testborne, sans énumérer
+les 1 906 884 combinaisons : programmation dynamique sur les positions triées.
+
+État après la position k (0..4) : dernière boule v, sommes partielles des
+fenêtres encore ouvertes (somme = positions 0..4, somme3f = 0..2,
+somme3c = 1..3, somme3l = 2..4) et score quartileshift partiel, avec le nombre
+de préfixes menant à cet état. On ajoute une boule x > v, on élimine les états
+qui ne peuvent plus respecter une borne (ou qui la violent quand la fenêtre se
+ferme), puis on fusionne les états identiques.
+Le score quartileshift est gardé en flottant, additionné position par position
+dans le même ordre que quartileshift_score_batch : comparaison aux bornes identique.
+
+    compter_passes(["somme"])                       => passe 'somme'
+    compter_passes(["somme", "somme3f"])            => passe les deux (joint)
+    compter_joints(FILTRES_COMPTABLES)              => {(f1, f2): nb} pour chaque paire
+    compter_passes(["somme"], {"somme": (90, 150)}) => avec d'autres bornes
+
+Mêmes constantes de config.py que les filtres. verifier() compare à la force
+brute (filtres batch sur l'univers) : 'python comptage.py'.
+"""
+
+import sys
+import time
+import itertools
+import numpy as np
+from config import (
+    SOMME_MIN, SOMME_MAX,
+    SOMME3F_MIN, SOMME3F_MAX,
+    SOMME3C_MIN, SOMME3C_MAX,
+    SOMME3L_MIN, SOMME3L_MAX,
+    QSHIFT_TESTBORNE_SCORE_95
+)
+from ranking import NB_BOULES, NB_TIRES, NB_COMBINAISONS
+from enumeration import _poids_qshift, _EPS
+
+FILTRES_COMPTABLES = ["somme", "somme3f", "somme3c", "somme3l", "quartileshift_testborne"]
+
+# filtre de somme => positions sommées (première, dernière)
+_FENETRES = {
+    "somme":   (0, 4),
+    "somme3f": (0, 2),
+    "somme3c": (1, 3),
+    "somme3l": (2, 4)
+}
+
+def bornes_defaut():
+    return {
+        "somme":   (SOMME_MIN, SOMME_MAX),
+        "somme3f": (SOMME3F_MIN, SOMME3F_MAX),
+        "somme3c": (SOMME3C_MIN, SOMME3C_MAX),
+        "somme3l": (SOMME3L_MIN, SOMME3L_MAX),
+        "quartileshift_testborne": tuple(QSHIFT_TESTBORNE_SCORE_95)
+    }
+
+# poids quartileshift par (position, boule)
+_POIDS = np.array([[_poids_qshift(pos, val) for val in range(NB_BOULES+1)]
+                   for pos in range(NB_TIRES)], dtype=np.float64)
+
+def _boule_max(pos):
+    # position pos (0..4) : boule au plus 45+pos
+    return NB_BOULES - NB_TIRES + 1 + pos
+
+def _fusionner(v, sommes, score, nb):
+    """
+    Regroupe les états identiques (v, sommes partielles, score) en additionnant nb.
+    """
+    cles = [v] + [sommes[f] for f in sommes]
+    if score is not None:
+        valeurs_score, idx_score = np.unique(score, return_inverse=True)
+        cles.append(idx_score)
+    # chaque composante < 256 => une clé int64
+    cle = np.zeros(len(v), dtype=np.int64)
+    for c in cles:
+        cle = (cle << 8) | c
+    uniques, inv = np.unique(cle, return_inverse=True)
+    nb = np.bincount(inv, weights=nb).astype(np.int64)
+    if score is not None:
+        score = valeurs_score[uniques & 0xFF]
+        uniques = uniques >> 8
+    noms = list(sommes)
+    for f in reversed(noms):
+        sommes[f] = uniques & 0xFF
+        uniques = uniques >> 8
+    return uniques, sommes, score, nb
+
+def compter_passes(filtres, bornes=None, stats=None):
+    """
+    Nombre exact de combinaisons qui passent TOUS les 'filtres'
+    (parmi FILTRES_COMPTABLES), avec les bornes de config.py ou 'bornes'.
+    """
+    inconnus = [f for f in filtres if f not in FILTRES_COMPTABLES]
+    if inconnus:
+        raise ValueError(f"Filtres sans comptage exact : {inconnus}")
+    b = bornes_defaut()
+    b.update(bornes or {})
+    fenetres = [f for f in FILTRES_COMPTABLES if f in filtres and f in _FENETRES]
+    avec_score = "quartileshift_testborne" in filtres
+    q_min, q_max = b["quartileshift_testborne"]
+    if stats is None:
+        stats = {}
+    stats["etats"] = []
+
+    v = np.zeros(1, dtype=np.int64)             # v = 0 : aucune boule posée
+    sommes = {f: np.zeros(1, dtype=np.int64) for f in fenetres}
+    score = np.zeros(1, dtype=np.float64) if avec_score else None
+    nb = np.ones(1, dtype=np.int64)
+    for pos in range(NB_TIRES):
+        # chaque état s'étend avec x = v+1 .. boule max de la position
+        n = np.maximum(_boule_max(pos) - v, 0)
+        rep = np.repeat(np.arange(len(v)), n)
+        debuts = np.repeat(np.cumsum(n) - n, n)
+        x = v[rep] + 1 + (np.arange(len(rep)) - debuts)
+        garde = np.ones(len(x), dtype=bool)
+        reste = NB_TIRES - 1 - pos
+        for f in list(sommes):
+            p0, p1 = _FENETRES[f]
+            lo, hi = b[f]
+            s = sommes[f][rep] + (x if p0 <= pos <= p1 else 0)
+            sommes[f] = s
+            if pos >= p1:
+                garde &= (s >= lo) & (s <= hi)
+                continue
+            # bornes atteignables avec les positions restantes de la fenêtre
+            restantes = range(max(pos+1, p0), p1+1)
+            s_min = s + sum(x + (i-pos) for i in restantes)
+            s_max = s + sum(_boule_max(i) for i in restantes)
+            garde &= (s_min <= hi) & (s_max >= lo)
+        if avec_score:
+            score = score[rep] + _POIDS[pos][x]
+            garde &= (score <= q_max + _EPS) & (score + reste >= q_min - _EPS)
+            if reste == 0:
+                garde &= (score >= q_min) & (score <= q_max)
+        v, nb = x[garde], nb[rep][garde]
+        sommes = {f: s[garde] for f, s in sommes.items() if pos < _FENETRES[f][1]}
+        if avec_score:
+            score = score[garde]
+        v, sommes, score, nb = _fusionner(v, sommes, score, nb)
+        stats["etats"].append(len(v))
+    return int(nb.sum())
+
+def compter_joints(filtres=None, bornes=None):
+    """
+    {(f,): nb} pour chaque filtre et {(f1, f2): nb} pour chaque paire.
+    """
+    filtres = filtres or FILTRES_COMPTABLES
+    res = {}
+    for k in (1, 2):
+        for groupe in itertools.combinations(filtres, k):
+            res[groupe] = compter_passes(list(groupe), bornes)
+    return res
+
+def verifier():
+    """
+    Compare le comptage à la force brute (filtres batch de filters.py
+    évalués sur tout l'univers) : chaque filtre, chaque paire, tous ensemble.
+    Renvoie la liste des écarts (vide si tout concorde).
+    """
+    from ranking import unrank_batch
+    from filters import FILTRES_BATCH
+    univers = unrank_batch(np.arange(NB_COMBINAISONS))
+    passe = {f: FILTRES_BATCH[f](univers).astype(bool) for f in FILTRES_COMPTABLES}
+    groupes = [list(g) for k in (1, 2) for g in itertools.combinations(FILTRES_COMPTABLES, k)]
+    groupes.append(FILTRES_COMPTABLES)
+    ecarts = []
+    for g in groupes:
+        brut = int(np.logical_and.reduce([passe[f] for f in g]).sum())
+        dp = compter_passes(g)
+        if dp != brut:
+            ecarts.append((g, dp, brut))
+    return ecarts
+
+if __name__ == "__main__":
+    t = time.time()
+    stats = {}
+    nb = compter_passes(FILTRES_COMPTABLES, stats=stats)
+    print(f"Tous les filtres de somme + quartileshift : {nb} combinaisons "
+          f"({time.time()-t:.3f} s, états par position : {stats['etats']})")
+    for groupe, n in compter_joints().items():
+        print(f"  {' & '.join(groupe):<42} {n:>8} ({(n/NB_COMBINAISONS)*100:.2f}%)")
+    t = time.time()
+    ecarts = verifier()
+    print(f"Vérification force brute : {'OK' if not ecarts else ecarts} ({time.time()-t:.1f} s)")
+    sys.exit(1 if ecarts else 0)
@@ -26,9 +26,56 @@ SOMME3L_MIN, SOMME3L_MAX    = 49, 138
 
 SIMILARITE_RECENTE_THRESHOLD = 3
 
+# Stockage des résultats de filtres pour une nouvelle base :
+# "colonnes" (13 colonnes 0/1 + nb_filtres_passes) ou "bitfield" (une colonne filter_flags)
+STOCKAGE_FILTRES  = "colonnes"
+
+# Profils de connexion SQLite (PRAGMA appliqués par create_connection / appliquer_profil)
+#  - "bulk" : génération et filtres (WAL, pas de fsync, gros cache, mmap, index différés)
+#  - "read" : résumés, extraction, GainCalculatorLoto (lecture possible pendant une écriture WAL)
+PROFILS_CONNEXION = {
+    "defaut": {},
+    "bulk": {
+        "journal_mode": "WAL",
+        "synchronous":  "OFF",
+        "cache_size":   -524288,      # en Ko => 512 Mo
+        "mmap_size":    1 << 30,
+        "temp_store":   "MEMORY"
+    },
+    "read": {
+        "synchronous":  "NORMAL",
+        "cache_size":   -262144,      # 256 Mo
+        "mmap_size":    1 << 30,
+        "temp_store":   "MEMORY"
+    }
+}
+
 LOG_INTERVAL      = 100000
 LOG_INTERVAL_HEUR = 10000
 CHUNK_SIZE_MPS    = 100000
+CHUNK_SIZE_SCAN   = 200000     # lignes par page pour iter_chunks (pagination par id)
+# Filtres appliqués par un UPDATE SQL utilisant les fonctions enregistrées (UDF)
+# au lieu d'un aller-retour des lignes par python (mode non fusionné)
+FILTRES_EN_SQL    = False
+# Processus pour l'évaluation parallèle des filtres (1 => évaluation série),
+# par exemple os.cpu_count() ; utilisé par le mode fusionné, le cache et les heuristiques
+NB_WORKERS        = 1
+# Cache persistant des résultats de filtres (cache_filtres.py) : un bitmap
+# de ~238 Ko par filtre et par jeu de seuils, éviction LRU au-delà de la taille max
+CACHE_FILTRES     = True
+CACHE_DIR         = os.path.join(ROOT_DIR, "cache_filtres")
+CACHE_TAILLE_MAX  = 64 * 1024 * 1024
+# Métriques brutes par combinaison (metriques.py), une .npy par métrique
+METRIQUES_DIR     = os.path.join(ROOT_DIR, "metriques")
+# Univers binaire (univers.py) : boules + bitmasks des 1 906 884 combinaisons
+# dans l'ordre des rangs (~25 Mo), écrit à la génération et lu par np.memmap
+UNIVERS_BINAIRE   = True
+UNIVERS_FILE      = os.path.join(ROOT_DIR, "univers_5sur49.bin")
+# Estimation par échantillonnage stratifié (estimation.py) : taille de
+# l'échantillon, graine (reproductible), effectif minimal par strate
+ESTIMATION_ECHANTILLON = 50000
+ESTIMATION_GRAINE      = 2024
+ESTIMATION_MIN_STRATE  = 30
 
 # Nouveau "quartileshift_testBorne" => On stocke pour chaque boule
 # un intervalle central => 1.0, un intervalle interm => 0.4, le reste => 0.0
@@ -0,0 +1,140 @@
+# couverture.py
+"""
+Réduction "k sur 5" par couverture d'ensembles gloutonne (set cover).
+
+But : choisir parmi les combinaisons d'entrée des tickets tels que chaque
+combinaison d'entrée partage au moins k boules avec un ticket choisi.
+Contrairement aux heuristiques (comparaison avec le seul voisin trié),
+tous les recouvrements sont pris en compte.
+
+Deux combinaisons partagent au moins k boules ssi elles ont un k-sous-ensemble
+commun. Index inversé (format CSR) : chaque k-sous-ensemble (clé = bitmask de
+ses k boules, regroupées par tri / np.unique) => liste des combinaisons qui le
+contiennent. Les combinaisons couvertes par un ticket t sont l'union des listes
+de ses C(5,k) sous-ensembles. Mémoire : C(5,k) x N entrées (int32).
+
+Glouton paresseux : file de priorité (heapq) de gains majorés ; à chaque
+extraction on recalcule le gain réel (combinaisons non couvertes) ; s'il reste
+le meilleur, le ticket est choisi, sinon il est remis dans la file avec son gain
+à jour. Les gains ne font que décroître : résultat identique au glouton exact
+(égalités départagées par le plus petit indice, donc le plus petit rang).
+
+Vérification (meilleur_recouvrement) : pour chaque combinaison source, nombre
+maximal de boules communes avec un ticket. Même principe, sans comparer les
+paires : pour k = 5..1, on cherche (searchsorted) les k-sous-ensembles de la
+source dans l'ensemble trié des k-sous-ensembles des tickets ; le premier k
+trouvé est le meilleur recouvrement.
+"""
+
+import time
+import heapq
+import itertools
+import logging
+import numpy as np
+from config import LOG_INTERVAL_HEUR, CHUNK_SIZE_SCAN
+from filters import boules_to_bitmask_batch
+
+logger = logging.getLogger(__name__)
+
+def _cles_sous_ensembles(arr, k):
+    """
+    (n, C(5,k)) bitmasks des k-sous-ensembles de chaque ligne de arr.
+    """
+    positions = list(itertools.combinations(range(arr.shape[1]), k))
+    sous = np.empty((len(arr), len(positions)), dtype=np.uint64)
+    for j, pos in enumerate(positions):
+        sous[:,j] = boules_to_bitmask_batch(arr[:, list(pos)])
+    return sous
+
+def index_k_sous_ensembles(arr, k):
+    """
+    Index inversé des k-sous-ensembles de arr (n,5) :
+    (cles (n, C(5,k)) int32 = id du sous-ensemble, debuts (nb_ids+1,), listes int32).
+    Les combinaisons contenant le sous-ensemble i sont listes[debuts[i]:debuts[i+1]].
+    """
+    arr = np.asarray(arr, dtype=np.int64)
+    n = len(arr)
+    sous = _cles_sous_ensembles(arr, k)
+    m = sous.shape[1]
+    _, ids = np.unique(sous.ravel(), return_inverse=True)
+    ids = ids.astype(np.int32)
+    del sous
+    ordre = np.argsort(ids, kind="stable")
+    listes = (ordre // m).astype(np.int32)
+    debuts = np.zeros(int(ids.max())+2 if n else 1, dtype=np.int64)
+    np.cumsum(np.bincount(ids), out=debuts[1:])
+    return ids.reshape(n, m), debuts, listes
+
+def couverture_gloutonne(arr, k, intervalle=None):
+    """
+    Indices (dans arr) des tickets choisis, dans l'ordre du glouton.
+    Chaque ligne de arr partage au moins k boules avec un ticket choisi.
+    """
+    if intervalle is None:
+        intervalle = LOG_INTERVAL_HEUR
+    n = len(arr)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    t0 = time.time()
+    cles, debuts, listes = index_k_sous_ensembles(arr, k)
+    m = cles.shape[1]
+    tailles = (debuts[1:] - debuts[:-1])[cles]
+    logger.info(f"Index {k}-sous-ensembles : {len(debuts)-1} clés, {len(listes)} entrées "
+                f"({time.time()-t0:.1f} s).")
+
+    # majorant du gain initial : la combinaison elle-même figure dans ses m listes
+    majorants = tailles.sum(axis=1) - (m-1)
+    file = [(-int(g), i) for i, g in enumerate(majorants.tolist())]
+    heapq.heapify(file)
+
+    couvert = np.zeros(n, dtype=bool)
+    nb_couverts = 0
+    choisis = []
+    evaluations = 0
+    while file and nb_couverts < n:
+        _, t = heapq.heappop(file)
+        c = np.concatenate([listes[debuts[i]:debuts[i+1]] for i in cles[t]])
+        c = np.unique(c[~couvert[c]])
+        evaluations += 1
+        gain = len(c)
+        if gain == 0:
+            continue
+        if file and (-gain, t) > file[0]:
+            # un autre ticket peut faire mieux : remis dans la file, gain à jour
+            heapq.heappush(file, (-gain, t))
+            continue
+        choisis.append(t)
+        couvert[c] = True
+        nb_couverts += gain
+        if len(choisis) % intervalle == 0:
+            print(f"Couverture {k}sur5 : {len(choisis)} tickets, {nb_couverts}/{n} couvertes "
+                  f"({(nb_couverts/n)*100:.1f}%), {evaluations} évaluations, {time.time()-t0:.1f} s")
+    print(f"Couverture {k}sur5 terminée : {len(choisis)} tickets pour {n} combinaisons "
+          f"({evaluations} évaluations, {time.time()-t0:.1f} s).")
+    return np.array(choisis, dtype=np.int64)
+
+def meilleur_recouvrement(source, tickets, chunk_size=None):
+    """
+    (n,) int8 : pour chaque ligne de source, nombre maximal de boules
+    communes avec une ligne de tickets (0..5).
+    """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE_SCAN
+    source = np.asarray(source, dtype=np.int64)
+    tickets = np.asarray(tickets, dtype=np.int64)
+    meilleur = np.zeros(len(source), dtype=np.int8)
+    if not len(source) or not len(tickets):
+        return meilleur
+    reste = np.arange(len(source))
+    for k in range(source.shape[1], 0, -1):
+        cles = np.unique(_cles_sous_ensembles(tickets, k))
+        trouve = np.zeros(len(reste), dtype=bool)
+        for debut in range(0, len(reste), chunk_size):
+            sous = _cles_sous_ensembles(source[reste[debut:debut+chunk_size]], k)
+            i = np.minimum(np.searchsorted(cles, sous), len(cles)-1)
+            trouve[debut:debut+chunk_size] = (cles[i] == sous).any(axis=1)
+        meilleur[reste[trouve]] = k
+        reste = reste[~trouve]
+        if not len(reste):
+            break
+    return meilleur
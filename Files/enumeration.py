@@ -0,0 +1,182 @@
+# enumeration.py
+"""
+Énumération élaguée des combinaisons (5 boules sur 49) sous contraintes de filtres.
+
+Au lieu de générer les 1 906 884 combinaisons puis de les filtrer, on parcourt
+l'arbre des combinaisons (boule1 < boule2 < ... < boule5, ordre lexicographique
+= ordre des rangs) et on coupe une branche dès que son préfixe ne peut plus
+satisfaire un des filtres imposés :
+  - somme, somme3f, somme3c, somme3l : bornes min / max atteignables de la somme
+    compte tenu des boules restantes (strictement croissantes, <= 49)
+  - dizaines : plus de DIZAINES_MAX boules dans une dizaine
+  - suite : compteur de suite déjà au-delà de SUITE_MAX
+  - quartileshift_testborne : score du préfixe + 1.0 par boule restante < min,
+    ou score du préfixe > max (poids >= 0)
+Ces coupes ne suppriment que des branches sans aucune combinaison valide ;
+chaque feuille est ensuite vérifiée exactement par les filtres batch de filters.py.
+Résultat : exactement les combinaisons qui passent, comme générer puis filtrer.
+
+Les autres filtres batch (mediane, variance, ecart, ecart_consecutif) peuvent
+être imposés : ils ne sont vérifiés qu'aux feuilles.
+"""
+
+import time
+import numpy as np
+from config import (
+    SOMME_MIN, SOMME_MAX,
+    DIZAINES_MAX,
+    SUITE_MAX,
+    SOMME3F_MIN, SOMME3F_MAX,
+    SOMME3C_MIN, SOMME3C_MAX,
+    SOMME3L_MIN, SOMME3L_MAX,
+    QSHIFT_TESTBORNE_BOUNDS,
+    QSHIFT_TESTBORNE_SCORE_95,
+    CHUNK_SIZE_SCAN
+)
+from ranking import NB_BOULES, NB_TIRES, rank_batch
+from filters import FILTRES_BATCH
+
+# filtres dont un préfixe peut décider (coupe de branche)
+FILTRES_ELAGABLES = [
+    "somme", "somme3f", "somme3c", "somme3l",
+    "dizaines", "suite", "quartileshift_testborne"
+]
+# filtres imposables à la génération (sans historique)
+FILTRES_ENUMERABLES = list(FILTRES_BATCH)
+
+# filtres de somme => (positions sommées, min, max)
+_SOMMES = {
+    "somme":   (range(0, 5), SOMME_MIN, SOMME_MAX),
+    "somme3f": (range(0, 3), SOMME3F_MIN, SOMME3F_MAX),
+    "somme3c": (range(1, 4), SOMME3C_MIN, SOMME3C_MAX),
+    "somme3l": (range(2, 5), SOMME3L_MIN, SOMME3L_MAX)
+}
+# tolérance des comparaisons de score flottant (la coupe doit rester sûre)
+_EPS = 1e-9
+
+def _poids_qshift(pos, val):
+    """
+    Poids 1.0 / 0.4 / 0.0 de la boule 'val' en position pos (0..4),
+    comme filtre_quartileshift_testBorne.
+    """
+    bdict = QSHIFT_TESTBORNE_BOUNDS[pos+1]
+    if bdict['central'] and bdict['central'][0] <= val <= bdict['central'][1]:
+        return 1.0
+    if bdict['intermediate'] and bdict['intermediate'][0] <= val <= bdict['intermediate'][1]:
+        return 0.4
+    return 0.0
+
+def _verdict(prefixe, contraintes, etat):
+    """
+    0 : préfixe viable
+    1 : aucune combinaison valide sous ce préfixe
+    2 : idem, et pour tous les préfixes frères de dernière boule plus grande
+        (la borne basse d'une somme ne fait que croître avec la dernière boule)
+    'etat' = (score quartileshift du préfixe, compteur de suite du préfixe).
+    """
+    L = len(prefixe)
+    v = prefixe[-1]
+    for nom in contraintes:
+        if nom in _SOMMES:
+            positions, s_min, s_max = _SOMMES[nom]
+            # position i (0..4) : au moins v+(i-L+1), au plus 45+i
+            lo = sum(prefixe[i] if i < L else v+(i-L+1) for i in positions)
+            if lo > s_max:
+                return 2
+            hi = sum(prefixe[i] if i < L else NB_BOULES-NB_TIRES+1+i for i in positions)
+            if hi < s_min:
+                return 1
+        elif nom == "dizaines":
+            if sum(1 for x in prefixe if x//10 == v//10) > DIZAINES_MAX:
+                return 1
+        elif nom == "suite":
+            if etat[1] > SUITE_MAX:
+                return 1
+        elif nom == "quartileshift_testborne":
+            score_min, score_max = QSHIFT_TESTBORNE_SCORE_95
+            if etat[0] > score_max + _EPS or etat[0] + (NB_TIRES-L) < score_min - _EPS:
+                return 1
+    return 0
+
+def _prefixes_viables(contraintes, stats):
+    """
+    Parcours en profondeur des préfixes de 4 boules, avec coupe.
+    Renvoie la liste des préfixes (b1..b4) survivants.
+    """
+    res = []
+    prefixe = []
+
+    def visiter(etat):
+        L = len(prefixe)
+        debut = prefixe[-1]+1 if prefixe else 1
+        for x in range(debut, NB_BOULES-NB_TIRES+L+2):
+            # compteur de suite : comme filtre_suite, diffs[0] n'est pas compté
+            compteur = etat[1]
+            if L >= 2:
+                compteur = compteur+1 if x-prefixe[-1] == 1 else 1
+            nouvel_etat = (etat[0] + _poids_qshift(L, x), compteur)
+            prefixe.append(x)
+            stats["noeuds"] += 1
+            v = _verdict(prefixe, contraintes, nouvel_etat)
+            if v == 0:
+                if L+1 == NB_TIRES-1:
+                    res.append(tuple(prefixe))
+                else:
+                    visiter(nouvel_etat)
+            else:
+                stats["coupes"] += 1
+            prefixe.pop()
+            if v == 2:
+                break
+
+    visiter((0.0, 1))
+    return res
+
+def enumerer_combinaisons(contraintes, chunk_size=None, stats=None):
+    """
+    Génère par blocs (rangs int64, boules (n,5) uint8), dans l'ordre des rangs,
+    exactement les combinaisons qui passent tous les filtres de 'contraintes'.
+    'stats' (dict) reçoit noeuds visités, coupes, feuilles testées et retenues.
+    """
+    inconnus = [c for c in contraintes if c not in FILTRES_ENUMERABLES]
+    if inconnus:
+        raise ValueError(f"Filtres non imposables à la génération : {inconnus}")
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE_SCAN
+    if stats is None:
+        stats = {}
+    stats.update(noeuds=0, coupes=0, feuilles=0, retenues=0)
+    elagables = [c for c in contraintes if c in FILTRES_ELAGABLES]
+    prefixes = np.array(_prefixes_viables(elagables, stats), dtype=np.int64).reshape(-1, NB_TIRES-1)
+
+    # feuilles : chaque préfixe (b1..b4) suivi de b5 = b4+1..49
+    nb = NB_BOULES - prefixes[:,-1]
+    fins = np.cumsum(nb)
+    i = 0
+    while i < len(prefixes):
+        # assez de préfixes pour ~chunk_size feuilles
+        j = max(int(np.searchsorted(fins, (fins[i-1] if i else 0) + chunk_size, side="right")), i+1)
+        p, n = prefixes[i:j], nb[i:j]
+        debuts = np.repeat(np.cumsum(n) - n, n)
+        b5 = np.repeat(p[:,-1], n) + 1 + (np.arange(int(n.sum())) - debuts)
+        arr = np.column_stack([np.repeat(p, n, axis=0), b5]).astype(np.uint8)
+        ok = np.ones(len(arr), dtype=bool)
+        for nom in contraintes:
+            ok &= FILTRES_BATCH[nom](arr).astype(bool)
+        stats["feuilles"] += len(arr)
+        arr = arr[ok]
+        stats["retenues"] += len(arr)
+        if len(arr):
+            yield rank_batch(arr), arr
+        i = j
+
+if __name__ == "__main__":
+    import sys
+    contraintes = sys.argv[1:] or FILTRES_ELAGABLES
+    t = time.time()
+    stats = {}
+    total = sum(len(r) for r, _ in enumerer_combinaisons(contraintes, stats=stats))
+    print(f"Contraintes : {', '.join(contraintes)}")
+    print(f"{total} combinaisons retenues ({time.time()-t:.2f} s) ; "
+          f"{stats['noeuds']} préfixes visités, {stats['coupes']} coupes, "
+          f"{stats['feuilles']} feuilles vérifiées.")
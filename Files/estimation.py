@@ -0,0 +1,125 @@
+# estimation.py
+"""
+Estimation rapide de la sélectivité des 13 filtres par échantillonnage stratifié.
+
+Les strates sont les valeurs de la première boule : les combinaisons de boule1 = b
+forment une plage contiguë de rangs (ordre lexicographique de ranking.py),
+de taille C(49-b, 4). On tire dans chaque strate un nombre de rangs proportionnel
+à sa taille (au moins ESTIMATION_MIN_STRATE), avec une graine fixe : l'échantillon
+est reproductible. Les filtres de filters.py (y compris mps et comparatif, avec
+l'historique) sont évalués sur l'échantillon.
+
+Pour chaque indicateur (passe un filtre, passe tous les filtres choisis,
+passe au moins k des 13), estimateur stratifié :
+    p = somme_h W_h p_h,  Var = somme_h W_h^2 p_h (1-p_h) / (n_h-1) (1 - n_h/N_h)
+avec W_h = N_h / N, et intervalle de confiance p +/- z sqrt(Var) (z = 1.96 => 95%).
+"""
+
+import time
+import numpy as np
+from math import comb, sqrt
+from config import ESTIMATION_ECHANTILLON, ESTIMATION_GRAINE, ESTIMATION_MIN_STRATE
+from ranking import NB_BOULES, NB_TIRES, NB_COMBINAISONS, rank_combinaison
+from filters import ORDRE_FILTRES, evaluer_filtre_batch, mps_histogramme
+from univers import lot_rangs
+
+Z_95 = 1.96
+
+def strates():
+    """
+    [(boule1, premier rang, taille)] : une strate par valeur de la première boule.
+    """
+    res = []
+    for b1 in range(1, NB_BOULES-NB_TIRES+2):
+        res.append((b1, rank_combinaison(range(b1, b1+NB_TIRES)), comb(NB_BOULES-b1, NB_TIRES-1)))
+    return res
+
+def echantillon_stratifie(taille=None, graine=None):
+    """
+    (rangs triés, strate de chaque rang, [(taille N_h, effectif n_h)] par strate).
+    Allocation proportionnelle, au moins ESTIMATION_MIN_STRATE par strate, sans remise.
+    """
+    taille = taille or ESTIMATION_ECHANTILLON
+    graine = ESTIMATION_GRAINE if graine is None else graine
+    rng = np.random.default_rng(graine)
+    rangs, idx, effectifs = [], [], []
+    for h, (_, debut, n_strate) in enumerate(strates()):
+        n_h = min(n_strate, max(ESTIMATION_MIN_STRATE, round(taille * n_strate / NB_COMBINAISONS)))
+        tirage = np.sort(rng.choice(n_strate, size=n_h, replace=False)) + debut
+        rangs.append(tirage)
+        idx.append(np.full(n_h, h, dtype=np.int64))
+        effectifs.append((n_strate, n_h))
+    return np.concatenate(rangs), np.concatenate(idx), effectifs
+
+def estimer(indicateur, idx, effectifs, z=Z_95):
+    """
+    indicateur = vecteur 0/1 sur l'échantillon => (proportion, demi-largeur de l'IC).
+    """
+    N = np.array([e[0] for e in effectifs], dtype=np.float64)
+    n = np.array([e[1] for e in effectifs], dtype=np.float64)
+    succes = np.bincount(idx, weights=indicateur, minlength=len(effectifs))
+    p_h = succes / n
+    W = N / NB_COMBINAISONS
+    var = np.sum(W**2 * p_h*(1-p_h) / np.maximum(n-1, 1) * (1 - n/N))
+    return float(np.sum(W*p_h)), z*sqrt(var)
+
+def estimer_filtres(historique, selection=None, taille=None, graine=None):
+    """
+    Évalue les 13 filtres sur l'échantillon stratifié et renvoie un dict :
+      'filtres'     : {filtre: (p, ic)}
+      'joint'       : (p, ic) de "passe tous les filtres de 'selection'"
+      'paires'      : {(f1, f2): (p, ic)} pour les paires de 'selection'
+      'au_moins_k'  : {k: (p, ic)} pour k = 1..13 (sur les 13 filtres)
+      'taille', 'duree'
+    Multiplier p par NB_COMBINAISONS donne un nombre de combinaisons.
+    """
+    t = time.time()
+    selection = [f for f in ORDRE_FILTRES if f in (selection or ORDRE_FILTRES)]
+    historique = list(historique or [])
+    rangs, idx, effectifs = echantillon_stratifie(taille, graine)
+    arr, masks = lot_rangs(rangs)
+    freq = mps_histogramme(historique)
+    passe = {f: np.asarray(evaluer_filtre_batch(f, arr, masks, historique, freq=freq), dtype=bool)
+             for f in ORDRE_FILTRES}
+    res = {"filtres": {f: estimer(passe[f], idx, effectifs) for f in ORDRE_FILTRES}}
+    res["joint"] = estimer(np.logical_and.reduce([passe[f] for f in selection]), idx, effectifs)
+    res["paires"] = {(f1, f2): estimer(passe[f1] & passe[f2], idx, effectifs)
+                     for i, f1 in enumerate(selection) for f2 in selection[i+1:]}
+    nb = np.sum([passe[f] for f in ORDRE_FILTRES], axis=0)
+    res["au_moins_k"] = {k: estimer(nb >= k, idx, effectifs) for k in range(1, len(ORDRE_FILTRES)+1)}
+    res["taille"] = len(rangs)
+    res["duree"] = time.time() - t
+    return res
+
+def rapport_estimation(res, selection=None):
+    """
+    Texte du rapport (nb de combinaisons estimé +/- IC 95%) : chaque filtre,
+    passe tous les filtres de 'selection' (défaut : les 13), chaque paire de la
+    sélection avec le rapport p(f1 et f2) / (p(f1) p(f2)) (1 = indépendants),
+    puis >= k filtres.
+    """
+    def fmt(p, ic):
+        return (f"{p*NB_COMBINAISONS:>10.0f} +/- {ic*NB_COMBINAISONS:>7.0f}"
+                f"  ({p*100:6.2f}% +/- {ic*100:.2f})")
+    lignes = [f"[Estimation sur {res['taille']} combinaisons, strates = boule1, IC 95%, "
+              f"{res['duree']:.2f} s]"]
+    for f, (p, ic) in res["filtres"].items():
+        lignes.append(f"  {f:<26} {fmt(p, ic)}")
+    nb_sel = len(selection) if selection else len(ORDRE_FILTRES)
+    lignes.append(f"  {f'tous les {nb_sel} filtres choisis':<26} {fmt(*res['joint'])}")
+    if res["paires"]:
+        lignes.append("  Paires (passe les deux, rapport à l'indépendance) :")
+        for (f1, f2), (p, ic) in res["paires"].items():
+            p_indep = res["filtres"][f1][0] * res["filtres"][f2][0]
+            ratio = p / p_indep if p_indep else 0.0
+            lignes.append(f"    {f1 + ' & ' + f2:<44} {fmt(p, ic)}  x{ratio:.3f}")
+    for k in range(len(ORDRE_FILTRES), len(ORDRE_FILTRES)-4, -1):
+        lignes.append(f"  {'>= ' + str(k) + ' filtres':<26} {fmt(*res['au_moins_k'][k])}")
+    return "\n".join(lignes)
+
+if __name__ == "__main__":
+    import random
+    random.seed(3)
+    hist = [sum(1 << (b-1) for b in random.sample(range(1, 50), 5)) for _ in range(300)]
+    res = estimer_filtres(hist)
+    print(rapport_estimation(res, ORDRE_FILTRES))
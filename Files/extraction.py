@@ -0,0 +1,99 @@
+# extraction.py
+"""
+Extraction "au moins k filtres" en évaluant directement les filtres de filters.py,
+dans un ordre choisi selon leur coût et leur sélectivité, avec arrêt anticipé.
+
+1) calibrer_filtres : sur un petit échantillon stratifié (estimation.py), on mesure
+   pour chaque filtre le coût par combinaison (s) et le taux de passage.
+2) ordre_filtres : tri par coût / taux de rejet croissant (un filtre bon marché
+   qui rejette beaucoup passe en premier ; ordre optimal si les filtres sont
+   indépendants).
+3) extraire_court_circuit : par tranches, chaque filtre n'est évalué que sur les
+   combinaisons encore indécises. Une combinaison sort dès qu'elle a plus de
+   13-k échecs (ne peut plus atteindre k) ou dès qu'elle a k succès (acquise).
+   Avec k = 13, une combinaison s'arrête à son premier échec.
+
+Le rapport donne le nombre d'évaluations faites contre 13 x N et le coût estimé
+économisé (évaluations évitées pondérées par le coût mesuré de chaque filtre).
+"""
+
+import time
+import numpy as np
+from config import CHUNK_SIZE_SCAN
+from filters import ORDRE_FILTRES, evaluer_filtre_batch, mps_histogramme
+from estimation import echantillon_stratifie
+from univers import lot_rangs
+
+TAILLE_CALIBRAGE = 20000
+
+def calibrer_filtres(historique, filtres=None, taille=TAILLE_CALIBRAGE):
+    """
+    {filtre: (coût par combinaison en s, taux de passage)} mesurés sur un échantillon.
+    """
+    filtres = filtres or ORDRE_FILTRES
+    rangs, _, _ = echantillon_stratifie(taille)
+    arr, masks = lot_rangs(rangs)
+    freq = mps_histogramme(historique)
+    res = {}
+    for f in filtres:
+        t = time.perf_counter()
+        v = np.asarray(evaluer_filtre_batch(f, arr, masks, historique, freq=freq), dtype=bool)
+        res[f] = ((time.perf_counter()-t) / len(rangs), float(v.mean()))
+    return res
+
+def ordre_filtres(calibrage):
+    """
+    Filtres triés par coût / taux de rejet croissant.
+    """
+    return sorted(calibrage, key=lambda f: calibrage[f][0] / max(1.0-calibrage[f][1], 1e-6))
+
+def extraire_court_circuit(rangs, k, historique, ordre, chunk_size=None):
+    """
+    Rangs (triés) parmi 'rangs' qui passent au moins k des filtres de 'ordre',
+    et le nombre d'évaluations faites par filtre.
+    """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE_SCAN
+    rangs = np.asarray(rangs, dtype=np.int64)
+    historique = list(historique)
+    freq = mps_histogramme(historique) if "mps" in ordre else None
+    max_echecs = len(ordre) - k
+    evaluations = dict.fromkeys(ordre, 0)
+    retenus = []
+    for debut in range(0, len(rangs), chunk_size):
+        r = rangs[debut:debut+chunk_size]
+        arr, masks = lot_rangs(r)
+        nb_ok = np.zeros(len(r), dtype=np.int16)
+        nb_ko = np.zeros(len(r), dtype=np.int16)
+        idx = np.arange(len(r))
+        for f in ordre:
+            if not len(idx):
+                break
+            v = np.asarray(evaluer_filtre_batch(f, arr[idx], masks[idx], historique, freq=freq), dtype=np.int16)
+            evaluations[f] += len(idx)
+            nb_ok[idx] += v
+            nb_ko[idx] += 1-v
+            # seules les combinaisons encore indécises continuent
+            idx = idx[(nb_ko[idx] <= max_echecs) & (nb_ok[idx] < k)]
+        retenus.append(r[nb_ok >= k])
+    return (np.concatenate(retenus) if retenus else np.zeros(0, dtype=np.int64)), evaluations
+
+def rapport_court_circuit(nb_rangs, calibrage, ordre, evaluations, nb_retenus, duree):
+    """
+    Texte du rapport : ordre retenu, évaluations par filtre, travail économisé.
+    """
+    total = nb_rangs * len(ordre)
+    faites = sum(evaluations.values())
+    cout_complet = sum(calibrage[f][0] for f in ordre) * nb_rangs
+    cout_fait = sum(calibrage[f][0] * evaluations[f] for f in ordre)
+    lignes = [f"[Extraction court-circuit : {nb_retenus} / {nb_rangs} combinaisons, {duree:.1f} s]"]
+    for f in ordre:
+        cout, taux = calibrage[f]
+        lignes.append(f"  {f:<26} {cout*1e9:8.0f} ns/combo  passe {taux*100:6.2f}%  "
+                      f"évalué sur {evaluations[f]:>8} ({(evaluations[f]/nb_rangs if nb_rangs else 0)*100:6.2f}%)")
+    if total:
+        lignes.append(f"  Évaluations : {faites} / {total} => {(1-faites/total)*100:.1f}% évitées")
+    if cout_complet:
+        lignes.append(f"  Coût estimé : {cout_fait:.2f} s au lieu de {cout_complet:.2f} s "
+                      f"=> {(1-cout_fait/cout_complet)*100:.1f}% économisé")
+    return "\n".join(lignes)
@@ -106,7 +106,101 @@ def filtre_quartileshift_testBorne(comb):
     (score_min, score_max)= QSHIFT_TESTBORNE_SCORE_95
     return 1 if (score_min<= score <= score_max) else 0
 
-def filtre_mps(list_of_combos, list_of_hist, exclude_self=True):
+def filtre_mps(list_of_combos, list_of_hist, exclude_self=True, freq=None):
+    """
+    Version "moteur" du filtre MPS : histogramme des 49 boules construit
+    une seule fois sur l'historique, puis score O(5) par combinaison.
+
+    moyenne = somme(freq[boule]) / (5 * nb_hist)
+    Avec exclude_self, on retire la contribution des tirages identiques
+    à la combinaison (5 boules communes chacun) et on les décompte de nb_hist.
+
+    Les cas à la limite exacte de [MPS_MIN..MPS_MAX] sont recalculés avec
+    l'ancienne boucle (filtre_mps_legacy) pour garder les mêmes 0/1.
+    'freq' permet de réutiliser un histogramme déjà calculé (mps_histogramme).
+    """
+    nb_hist = len(list_of_hist)
+    if nb_hist==0:
+        return [1]*len(list_of_combos)
+    if len(list_of_combos)==0:
+        return []
+
+    if freq is None:
+        freq = mps_histogramme(list_of_hist)
+    masks = np.asarray(list_of_combos, dtype=np.uint64)
+
+    # total = nb de boules communes cumulé sur tout l'historique
+    total = np.zeros(len(masks), dtype=np.int64)
+    for b in range(49):
+        if freq[b]:
+            bit = ((masks >> np.uint64(b)) & np.uint64(1)).astype(np.int64)
+            total += bit * freq[b]
+    c_h = np.full(len(masks), nb_hist, dtype=np.int64)
+
+    if exclude_self:
+        hist_arr = np.asarray(list_of_hist, dtype=np.uint64)
+        uniq, cnt = np.unique(hist_arr, return_counts=True)
+        pos = np.searchsorted(uniq, masks)
+        pos[pos>=len(uniq)] = 0
+        dup = np.where(uniq[pos]==masks, cnt[pos], 0).astype(np.int64)
+        total -= 5*dup
+        c_h -= dup
+
+    denom = 5*c_h
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = np.where(c_h>0, total/np.maximum(denom,1), 1.0)
+    res = ((avg>=MPS_MIN) & (avg<=MPS_MAX)).astype(np.uint8)
+
+    # cas limites : écart au seuil inférieur à l'erreur d'arrondi
+    # de l'ancienne somme flottante => on reprend l'ancien calcul
+    eps = 1e-9
+    limite = (np.abs(avg-MPS_MIN)<eps) | (np.abs(avg-MPS_MAX)<eps)
+    for i in np.nonzero(limite)[0]:
+        res[i] = filtre_mps_legacy([int(masks[i])], list_of_hist, exclude_self)[0]
+
+    return res.tolist()
+
+def mps_histogramme(list_of_hist):
+    """
+    Fréquence de chaque boule (index 0..48 => boule 1..49) dans l'historique.
+    """
+    freq = [0]*49
+    for h_mask in list_of_hist:
+        m = int(h_mask)
+        while m:
+            low = m & -m
+            b = low.bit_length()-1
+            if b<49:
+                freq[b]+= 1
+            m ^= low
+    return freq
+
+def filtre_mps_scalaire(c_mask, list_of_hist, freq):
+    """
+    filtre_mps pour une seule combinaison, sans exclude_self (usage en UDF SQLite) :
+    mêmes 0/1 que filtre_mps(..., exclude_self=False) sans le coût numpy par appel.
+    """
+    nb_hist = len(list_of_hist)
+    if nb_hist==0:
+        return 1
+    total = 0
+    m = int(c_mask)
+    while m:
+        low = m & -m
+        b = low.bit_length()-1
+        if b<49:
+            total+= freq[b]
+        m ^= low
+    avg = total/(5*nb_hist)
+    if abs(avg-MPS_MIN)<1e-9 or abs(avg-MPS_MAX)<1e-9:
+        return filtre_mps_legacy([int(c_mask)], list_of_hist, exclude_self=False)[0]
+    return 1 if MPS_MIN<= avg <= MPS_MAX else 0
+
+def filtre_mps_legacy(list_of_combos, list_of_hist, exclude_self=True):
+    """
+    Ancienne implémentation (double boucle, popcount par paire).
+    Conservée comme référence et pour les cas limites de filtre_mps.
+    """
     results = []
     nb_hist = len(list_of_hist)
     if nb_hist==0:
@@ -145,42 +239,290 @@ def filtre_comparatif(comb_mask, last4_bitmasks, threshold=3):
             return 0
     return 1
 
+# ---------------------------------------------------------------------
+# Versions "batch" : un tableau (N,5) uint8 => un vecteur (N,) de 0/1
+# Mêmes règles (et mêmes calculs flottants) que les versions scalaires.
+# ---------------------------------------------------------------------
+
+def _diffs_batch(arr):
+    return np.diff(arr.astype(np.int16), axis=1)
+
+def filtre_somme_batch(arr):
+    s = arr.astype(np.int16).sum(axis=1)
+    return ((s>=SOMME_MIN) & (s<=SOMME_MAX)).astype(np.uint8)
+
+def filtre_dizaines_batch(arr):
+    d = arr // 10
+    ok = np.ones(len(arr), dtype=bool)
+    for dz in range(int(d.max())+1 if len(arr) else 0):
+        ok &= (d==dz).sum(axis=1) <= DIZAINES_MAX
+    return ok.astype(np.uint8)
+
+def filtre_suite_batch(arr):
+    diffs = _diffs_batch(arr)
+    count = np.ones(len(arr), dtype=np.int16)
+    ok = np.ones(len(arr), dtype=bool)
+    # comme la version scalaire, diffs[0] n'est pas compté
+    for i in range(1, diffs.shape[1]):
+        count = np.where(diffs[:,i]==1, count+1, 1)
+        ok &= count <= SUITE_MAX
+    return ok.astype(np.uint8)
+
+def filtre_mediane_batch(arr):
+    med = np.median(_diffs_batch(arr), axis=1)
+    return ((med>=MEDIAN_MIN) & (med<=MEDIAN_MAX)).astype(np.uint8)
+
+def filtre_variance_batch(arr):
+    var = np.var(arr.astype(np.int64), axis=1)
+    return ((var>=VARIANCE_MIN) & (var<=VARIANCE_MAX)).astype(np.uint8)
+
+def filtre_ecart_batch(arr):
+    med = np.median(_diffs_batch(arr), axis=1)
+    return ((med>=ECART_MIN) & (med<=ECART_MAX)).astype(np.uint8)
+
+def filtre_ecart_consecutif_batch(arr):
+    diffs = _diffs_batch(arr)
+    e_lo, e_hi, e_max = ECART_CONSECUTIF
+    length = np.ones(len(arr), dtype=np.int16)
+    ok = np.ones(len(arr), dtype=bool)
+    for i in range(1, diffs.shape[1]):
+        d = diffs[:,i]
+        same = (d==diffs[:,i-1]) & (d>=e_lo) & (d<=e_hi)
+        length = np.where(same, length+1, 1)
+        ok &= length <= e_max
+    return ok.astype(np.uint8)
+
+def quartileshift_score_batch(arr):
+    """
+    Score 1.0/0.4/0.0 cumulé position par position (même ordre d'addition
+    que filtre_quartileshift_testBorne).
+    """
+    score = np.zeros(len(arr), dtype=np.float64)
+    for pos in range(1,6):
+        val = arr[:,pos-1]
+        bdict = QSHIFT_TESTBORNE_BOUNDS[pos]
+        weight = np.zeros(len(arr), dtype=np.float64)
+        if bdict['intermediate']:
+            i_lo,i_hi = bdict['intermediate']
+            weight = np.where((val>=i_lo) & (val<=i_hi), 0.4, weight)
+        if bdict['central']:
+            c_lo,c_hi = bdict['central']
+            weight = np.where((val>=c_lo) & (val<=c_hi), 1.0, weight)
+        score = score + weight
+    return score
+
+def filtre_quartileshift_testBorne_batch(arr):
+    score = quartileshift_score_batch(arr)
+    (score_min, score_max)= QSHIFT_TESTBORNE_SCORE_95
+    return ((score>=score_min) & (score<=score_max)).astype(np.uint8)
+
+def filtre_somme3f_batch(arr):
+    s = arr[:,:3].astype(np.int16).sum(axis=1)
+    return ((s>=SOMME3F_MIN) & (s<=SOMME3F_MAX)).astype(np.uint8)
+
+def filtre_somme3c_batch(arr):
+    s = arr[:,1:-1].astype(np.int16).sum(axis=1)
+    return ((s>=SOMME3C_MIN) & (s<=SOMME3C_MAX)).astype(np.uint8)
+
+def filtre_somme3l_batch(arr):
+    s = arr[:,-3:].astype(np.int16).sum(axis=1)
+    return ((s>=SOMME3L_MIN) & (s<=SOMME3L_MAX)).astype(np.uint8)
+
+def popcount64(masks):
+    """
+    Nombre de bits à 1 de chaque uint64 d'un tableau.
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks).astype(np.uint8)
+    octets = masks.view(np.uint8).reshape(masks.shape + (8,))
+    return _POPCOUNT8[octets].sum(axis=-1, dtype=np.uint8)
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def filtre_comparatif_batch(masks, last4_bitmasks, threshold=3):
+    masks = np.asarray(masks, dtype=np.uint64)
+    ok = np.ones(len(masks), dtype=bool)
+    for h_mask in last4_bitmasks:
+        ok &= popcount64(masks & np.uint64(h_mask)) < threshold
+    return ok.astype(np.uint8)
+
+def boules_to_bitmask_batch(arr):
+    """
+    (N,5) boules => (N,) bitmask uint64 (bit x-1 pour la boule x).
+    """
+    masks = np.zeros(len(arr), dtype=np.uint64)
+    for j in range(arr.shape[1]):
+        masks |= np.uint64(1) << (arr[:,j].astype(np.uint64) - np.uint64(1))
+    return masks
+
+# filtres calculables directement sur le tableau (N,5) de boules
+FILTRES_BATCH = {
+    "somme": filtre_somme_batch,
+    "dizaines": filtre_dizaines_batch,
+    "suite": filtre_suite_batch,
+    "mediane": filtre_mediane_batch,
+    "variance": filtre_variance_batch,
+    "ecart": filtre_ecart_batch,
+    "ecart_consecutif": filtre_ecart_consecutif_batch,
+    "quartileshift_testborne": filtre_quartileshift_testBorne_batch,
+    "somme3f": filtre_somme3f_batch,
+    "somme3c": filtre_somme3c_batch,
+    "somme3l": filtre_somme3l_batch
+}
+
+# ordre "historique" des 13 filtres (colonnes filtre_<nom>)
+ORDRE_FILTRES = [
+    "somme","dizaines","suite","mediane","variance",
+    "ecart","ecart_consecutif","quartileshift_testborne","mps",
+    "somme3f","somme3c","somme3l","comparatif"
+]
+
+def evaluer_filtre_batch(nom, arr, masks, historique, freq=None):
+    """
+    Évalue un des 13 filtres sur un lot :
+      arr = (N,5) boules, masks = (N,) bitmasks, historique = bitmasks des tirages.
+    mps et comparatif utilisent l'historique comme dans apply_filter.
+    """
+    if nom=="mps":
+        return np.asarray(filtre_mps(masks, historique, exclude_self=False, freq=freq), dtype=np.uint8)
+    if nom=="comparatif":
+        last10_bitmasks= historique[-10:] if len(historique)>=10 else []
+        return filtre_comparatif_batch(masks, last10_bitmasks, threshold=3)
+    return FILTRES_BATCH[nom](arr)
+
 # Heuristiques
-def heuristic_4sur5(combos):
-    combos_sorted= sorted(combos)
-    coverage=[]
-    temp= combos_sorted[0]
-    total= len(combos_sorted)
-    for i,c in enumerate(combos_sorted[1:], start=1):
-        if len(set(temp).intersection(c))>=4:
-            if c< temp:
-                temp= c
+# Parcours des combinaisons triées (ordre lexicographique = ordre des rangs) :
+# le "leader" courant absorbe les suivantes tant qu'elles partagent au moins
+# 'seuil' boules avec lui ; la première qui en partage moins devient le leader
+# suivant. La couverture renvoyée est la liste des leaders.
+
+def _decrochage(masks, lead, j, seuil, bloc=64):
+    """
+    Premier indice >= j tel que popcount(lead & masks[.]) < seuil (len(masks) sinon),
+    lu par blocs de taille doublée à chaque bloc sans décrochage.
+    """
+    n = len(masks)
+    b = bloc
+    while j < n:
+        seg = masks[j:j+b]
+        ko = np.flatnonzero(popcount64(seg & lead) < seuil)
+        if len(ko):
+            return j + int(ko[0])
+        j += len(seg)
+        b *= 2
+    return n
+
+def heuristic_leaders(masks, seuil, decalage_max=16, bloc=64):
+    """
+    Noyau commun (bitmasks uint64 déjà triés) => indices des leaders.
+    1) pré-calcul vectorisé sur toutes les positions i à la fois : pour d = 1, 2, ...
+       'suivant[i]' = i+d si d est le premier décalage avec
+       popcount(masks[i] & masks[i+d]) < seuil (arrêt à decalage_max, ou dès
+       qu'un décalage résout moins de 2% des positions restantes) ;
+    2) chaînage des leaders 0 -> suivant[0] -> ... ; un leader non résolu
+       est prolongé par blocs de popcount(leader & masks[j:j+b]),
+       b doublé à chaque bloc sans décrochage.
+    Chaque combinaison n'est lue qu'une fois par le chaînage.
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    n = len(masks)
+    suivant = np.full(n, -1, dtype=np.int64)
+    en_attente = np.arange(n, dtype=np.int64)
+    d = 0
+    for d in range(1, decalage_max+1):
+        hors = en_attente + d >= n
+        suivant[en_attente[hors]] = n
+        en_attente = en_attente[~hors]
+        if not len(en_attente):
+            break
+        ko = popcount64(masks[en_attente] & masks[en_attente+d]) < seuil
+        suivant[en_attente[ko]] = en_attente[ko] + d
+        en_attente = en_attente[~ko]
+        if ko.sum() < 0.02*len(ko):
+            break
+    suivant = suivant.tolist()
+
+    leaders = []
+    i = 0
+    while i < n:
+        leaders.append(i)
+        j = suivant[i]
+        if j < 0:
+            # aucun décrochage dans les d premières suivantes
+            j = _decrochage(masks, masks[i], i + d + 1, seuil, bloc)
+        i = j
+    return np.array(leaders, dtype=np.int64)
+
+def raccorder_leaders(masks, seuil, bornes, locaux, bloc=64):
+    """
+    Raccorde les leaders calculés indépendamment sur des partitions contiguës
+    [bornes[p], bornes[p+1]) de masks (locaux[p] : indices globaux, chaîne
+    commencée au premier élément de la partition) => (leaders, nb recalculés).
+    Le dernier leader d'une partition peut couvrir le début de la suivante :
+    on recalcule la chaîne série depuis ce leader jusqu'à retomber sur un
+    leader local ; la chaîne ne dépend que du leader courant, donc la suite
+    de la partition est reprise telle quelle. Résultat identique à
+    heuristic_leaders(masks, seuil).
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    n = len(masks)
+    est_local = np.zeros(n+1, dtype=bool)
+    for loc in locaux:
+        est_local[loc] = True
+    leaders = []
+    recalcules = 0
+    p = 0
+    j = 0
+    while j < n:
+        while bornes[p+1] <= j:
+            p += 1
+        if est_local[j]:
+            # même leader que la chaîne locale : reste de la partition inchangé
+            loc = locaux[p]
+            leaders.append(loc[np.searchsorted(loc, j):])
+            # aucun décrochage du dernier leader dans sa partition
+            j = _decrochage(masks, masks[loc[-1]], int(bornes[p+1]), seuil, bloc)
         else:
-            coverage.append(temp)
-            temp= c
-    coverage.append(temp)
-    return coverage
+            leaders.append(np.array([j], dtype=np.int64))
+            recalcules += 1
+            j = _decrochage(masks, masks[j], j+1, seuil, bloc)
+    res = np.concatenate(leaders) if leaders else np.zeros(0, dtype=np.int64)
+    return res, recalcules
+
+def heuristic_kofn(combos, seuil):
+    """
+    Même résultat que l'ancien parcours (heuristic_legacy) : liste des leaders
+    (tuples), avec recouvrement calculé sur bitmasks.
+    """
+    if len(combos)==0:
+        return []
+    arr = np.asarray(combos, dtype=np.int64)
+    # tri lexicographique des tuples, comme sorted(combos)
+    ordre = np.lexsort(arr.T[::-1])
+    arr = arr[ordre]
+    leaders = heuristic_leaders(boules_to_bitmask_batch(arr), seuil)
+    return [tuple(c) for c in arr[leaders].tolist()]
+
+def heuristic_4sur5(combos):
+    return heuristic_kofn(combos, 4)
 
 def heuristic_3sur5(combos):
-    combos_sorted= sorted(combos)
-    coverage=[]
-    temp= combos_sorted[0]
-    for c in combos_sorted[1:]:
-        if len(set(temp).intersection(c))>=3:
-            if c<temp:
-                temp= c
-        else:
-            coverage.append(temp)
-            temp= c
-    coverage.append(temp)
-    return coverage
+    return heuristic_kofn(combos, 3)
 
 def heuristic_2sur5(combos):
+    return heuristic_kofn(combos, 2)
+
+def heuristic_legacy(combos, seuil):
+    """
+    Ancienne implémentation (intersection d'ensembles à chaque pas),
+    conservée comme référence pour heuristic_kofn.
+    """
     combos_sorted= sorted(combos)
     coverage=[]
     temp= combos_sorted[0]
     for c in combos_sorted[1:]:
-        if len(set(temp).intersection(c))>=2:
+        if len(set(temp).intersection(c))>=seuil:
             if c<temp:
                 temp= c
         else:
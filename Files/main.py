@@ -6,14 +6,20 @@ Point d'entrée du programme : prints, questions (y/n), appels de fonctions...
 import os
 import logging
 from config import (
+    STOCKAGE_FILTRES,
     BDD_NAME_PREFIX,
     EXCEL_FILE,
-    LOG_FILE
+    LOG_FILE,
+    NB_WORKERS
 )
 from utils import (
     create_connection,
+    appliquer_profil,
     create_tables,
     ensure_combinaisons_filtrees_columns,
+    ensure_rang_columns,
+    mode_stockage,
+    convertir_stockage_bitfield,
     fix_null_columns,
     import_historique,
     process_historique_stats,
@@ -26,9 +32,17 @@ from utils import (
     apply_heuristique_4sur5,
     apply_heuristique_3sur5,
     apply_heuristique_2sur5,
+    pipeline_heuristiques,
+    comparer_heuristique_parallele,
+    verifier_couverture,
     final_tables_summary,
     random_draw_from_table
 )
+from migration import tables_a_migrer, migrer_connexion
+from metriques import calculer_metriques, seuils_filtres, compter_passes
+from enumeration import FILTRES_ENUMERABLES
+from estimation import estimer_filtres, rapport_estimation
+from filters import ORDRE_FILTRES
 
 logging.basicConfig(
     level=logging.INFO,
@@ -63,14 +77,29 @@ def main():
         print("Aucune action, fin du programme.")
         return
 
-    conn = create_connection(db_file)
+    # profil "bulk" pour la génération et les filtres, "read" ensuite
+    conn = create_connection(db_file, profil="bulk")
     if not conn:
         return
 
+    # Ancien format (colonne texte 'boules') => migration en colonnes typées
+    if tables_a_migrer(conn):
+        print("Cette base utilise l'ancien format texte pour les boules.")
+        if input("Migrer la base vers les colonnes boule1..boule5 ? (y/n) : ").lower().strip()=="y":
+            migrer_connexion(conn)
+        else:
+            print("Migration requise pour continuer. Fin.")
+            conn.close()
+            return
+
     # Création des tables, etc.
     create_tables(conn)
     ensure_combinaisons_filtrees_columns(conn)
+    ensure_rang_columns(conn)
     fix_null_columns(conn)
+    if STOCKAGE_FILTRES=="bitfield" and mode_stockage(conn)=="colonnes":
+        if input("Convertir les colonnes de filtres en stockage bitfield ? (y/n) : ").lower().strip()=="y":
+            convertir_stockage_bitfield(conn)
 
     # Historique
     if input("\nImporter l'historique Excel ? (y/n) : ").lower().strip()=="y":
@@ -83,9 +112,24 @@ def main():
         print("\n[Résumé des stats historiques]\n")
         print(sum_histo,"\n")
 
+    # Métriques brutes de l'univers (réglage des seuils sans relancer les filtres)
+    if input("Précalculer les métriques brutes des filtres ? (y/n) : ").lower().strip()=="y":
+        c=conn.cursor()
+        c.execute("SELECT bitmask FROM Historique ORDER BY id")
+        hist_metriques = [r[0] for r in c.fetchall()]
+        calculer_metriques(hist_metriques)
+        print("\n[Combinaisons passant chaque filtre, seuils actuels]\n")
+        for nom, (metrique, lo, hi) in seuils_filtres().items():
+            print(f"  {nom:<24} {lo} <= {metrique} <= {hi} : {compter_passes(filtres=[nom], historique=hist_metriques)}")
+        print()
+
     # Génération de toutes les combinaisons
     if input("Générer les combinaisons dans Combinaisons_Filtrees ? (y/n) : ").lower().strip()=="y":
-        generate_combinations_in_filtrees(conn)
+        contraintes= []
+        if input("Génération élaguée (n'insérer que les combos passant certains filtres) ? (y/n) : ").lower().strip()=="y":
+            contraintes= [f for f in FILTRES_ENUMERABLES
+                          if input(f"Imposer le filtre '{f}' à la génération ? (y/n) : ").lower().strip()=="y"]
+        generate_combinations_in_filtrees(conn, contraintes)
 
     # Filtrage interactif
     if input("\nAppliquer les 13 filtres sur Combinaisons_Filtrees ? (y/n) : ").lower().strip()=="y":
@@ -93,6 +137,11 @@ def main():
         c=conn.cursor()
         c.execute("SELECT bitmask FROM Historique ORDER BY id")
         hist_for_filters = [r[0] for r in c.fetchall()]
+        # aperçu de la configuration avant la passe complète
+        if input("Estimer d'abord la sélectivité des filtres sur un échantillon ? (y/n) : ").lower().strip()=="y":
+            saisie = input("Filtres envisagés (noms séparés par des virgules, vide = les 13) : ")
+            selection = [f.strip() for f in saisie.split(",") if f.strip() in ORDRE_FILTRES] or list(ORDRE_FILTRES)
+            print("\n"+rapport_estimation(estimer_filtres(hist_for_filters, selection), selection)+"\n")
         apply_all_filters_interactive(conn, hist_for_filters)
 
     # Stats combos
@@ -102,18 +151,42 @@ def main():
         print("\n[Résumé des stats sur les combinaisons]\n")
         print(combo_sum,"\n")
 
+    appliquer_profil(conn, "read")
+
     # Extraction par seuil
     tab_ex = extraction_seuil(conn)
 
-    # Heuristiques
-    if tab_ex and input("\nAppliquer heuristique 4sur5 sur le dernier tableau extrait ? (y/n) : ").lower().strip()=="y":
-        apply_heuristique_4sur5(conn, table_name="CombinaisonsExtraites")
-
-    if input("Appliquer heuristique 3sur5 ? (y/n) : ").lower().strip()=="y":
-        apply_heuristique_3sur5(conn, table_name="Heuristique4sur5")
-
-    if input("Appliquer heuristique 2sur5 ? (y/n) : ").lower().strip()=="y":
-        apply_heuristique_2sur5(conn, table_name="Heuristique3sur5")
+    # Heuristiques (le mode de réduction n'est demandé que si une étape est appliquée)
+    question_couverture = ("Réduction par couverture gloutonne (tous les recouvrements, plus lent) "
+                           "au lieu du parcours trié ? (y/n) : ")
+    chaine = tab_ex and input("\nEnchaîner 4sur5 => 3sur5 => 2sur5 en mémoire sur le dernier tableau extrait ? (y/n) : ").lower().strip()=="y"
+    if chaine:
+        garder = input("Conserver aussi Heuristique4sur5 et Heuristique3sur5 ? (y/n) : ").lower().strip()=="y"
+        verifier = input("Vérifier la couverture de chaque étape ? (y/n) : ").lower().strip()=="y"
+        couverture = input(question_couverture).lower().strip()=="y"
+        pipeline_heuristiques(conn, "CombinaisonsExtraites", couverture=couverture,
+                              persister=(4, 3, 2) if garder else (2,), verifier=verifier)
+    else:
+        etape4 = bool(tab_ex) and input("Appliquer heuristique 4sur5 sur le dernier tableau extrait ? (y/n) : ").lower().strip()=="y"
+        etape3 = input("Appliquer heuristique 3sur5 ? (y/n) : ").lower().strip()=="y"
+        etape2 = input("Appliquer heuristique 2sur5 ? (y/n) : ").lower().strip()=="y"
+        couverture = (etape4 or etape3 or etape2) and input(question_couverture).lower().strip()=="y"
+        if etape4:
+            apply_heuristique_4sur5(conn, table_name="CombinaisonsExtraites", couverture=couverture)
+        if etape3:
+            apply_heuristique_3sur5(conn, table_name="Heuristique4sur5", couverture=couverture)
+        if etape2:
+            apply_heuristique_2sur5(conn, table_name="Heuristique3sur5", couverture=couverture)
+
+    if NB_WORKERS>1 and tab_ex and input("Comparer l'heuristique 4sur5 série / parallèle ? (y/n) : ").lower().strip()=="y":
+        comparer_heuristique_parallele(conn, "CombinaisonsExtraites", 4)
+
+    # après l'enchaînement en mémoire, la vérification est faite sur les tableaux
+    if not chaine and input("Vérifier la couverture des tables heuristiques ? (y/n) : ").lower().strip()=="y":
+        for source, tickets, seuil in [("CombinaisonsExtraites", "Heuristique4sur5", 4),
+                                       ("Heuristique4sur5", "Heuristique3sur5", 3),
+                                       ("Heuristique3sur5", "Heuristique2sur5", 2)]:
+            verifier_couverture(conn, source, tickets, seuil)
 
     # Résumé final
     final_tables_summary(conn)
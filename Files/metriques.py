@@ -0,0 +1,277 @@
+# metriques.py
+"""
+Métriques brutes des filtres sur l'univers des 1 906 884 combinaisons (ordre des rangs).
+
+Les filtres ne stockent que 0/1 ; ici on garde la valeur sous-jacente
+(somme, variance, médiane des écarts, score quartileshift, moyenne MPS, ...)
+dans un fichier .npy par métrique, relu en np.memmap.
+Changer un seuil devient une simple comparaison vectorisée :
+
+    compter_passes({"variance": (20, 300)})          => nb de combos qui passent
+    balayage("variance", [(20, m) for m in range(250, 400, 10)])
+
+Les métriques qui dépendent de config.py (score quartileshift, suites d'écarts)
+ou de l'historique (MPS) ont une empreinte dans le nom du fichier.
+L'histogramme (valeurs distinctes, effectifs) de chaque métrique est écrit à côté
+(<métrique>_histo.npz) : compter_intervalle / balayage ne relisent que lui.
+
+Usage :
+    python metriques.py                      => calcule les métriques sans historique
+    python metriques.py variance 20 300      => nb de combos avec 20 <= variance <= 300
+"""
+
+import os
+import sys
+import time
+import hashlib
+import logging
+import numpy as np
+import config
+from ranking import NB_COMBINAISONS
+from filters import (
+    _diffs_batch,
+    quartileshift_score_batch,
+    mps_histogramme
+)
+from univers import lot_tranche
+
+logger = logging.getLogger(__name__)
+
+def _calc_somme(arr, masks, ctx):
+    return arr.astype(np.int16).sum(axis=1)
+
+def _calc_somme3f(arr, masks, ctx):
+    return arr[:,:3].astype(np.int16).sum(axis=1)
+
+def _calc_somme3c(arr, masks, ctx):
+    return arr[:,1:-1].astype(np.int16).sum(axis=1)
+
+def _calc_somme3l(arr, masks, ctx):
+    return arr[:,-3:].astype(np.int16).sum(axis=1)
+
+def _calc_variance(arr, masks, ctx):
+    # même calcul flottant que filtre_variance_batch
+    return np.var(arr.astype(np.int64), axis=1)
+
+def _calc_mediane_ecart(arr, masks, ctx):
+    # médiane de 4 écarts entiers => x.0 ou x.5, exacte en float32
+    return np.median(_diffs_batch(arr), axis=1).astype(np.float32)
+
+def _calc_dizaines_max(arr, masks, ctx):
+    d = arr // 10
+    return np.stack([(d==dz).sum(axis=1) for dz in range(5)], axis=1).max(axis=1).astype(np.uint8)
+
+def _calc_suite_max(arr, masks, ctx):
+    # compteur de filtre_suite_batch (diffs[0] non compté), maximum atteint
+    diffs = _diffs_batch(arr)
+    count = np.ones(len(arr), dtype=np.uint8)
+    res = count.copy()
+    for i in range(1, diffs.shape[1]):
+        count = np.where(diffs[:,i]==1, count+1, 1).astype(np.uint8)
+        res = np.maximum(res, count)
+    return res
+
+def _calc_ecart_consecutif_max(arr, masks, ctx):
+    # longueur de filtre_ecart_consecutif_batch, maximum atteint
+    diffs = _diffs_batch(arr)
+    e_lo, e_hi, _ = config.ECART_CONSECUTIF
+    length = np.ones(len(arr), dtype=np.uint8)
+    res = length.copy()
+    for i in range(1, diffs.shape[1]):
+        d = diffs[:,i]
+        same = (d==diffs[:,i-1]) & (d>=e_lo) & (d<=e_hi)
+        length = np.where(same, length+1, 1).astype(np.uint8)
+        res = np.maximum(res, length)
+    return res
+
+def _calc_qshift_score(arr, masks, ctx):
+    return quartileshift_score_batch(arr)
+
+def _calc_mps_moyenne(arr, masks, ctx):
+    # moyenne MPS sans exclude_self (comme l'étape mps sur Combinaisons_Filtrees)
+    freq, nb_hist = ctx["freq"], ctx["nb_hist"]
+    if nb_hist==0:
+        return np.ones(len(masks), dtype=np.float64)
+    total = np.zeros(len(masks), dtype=np.int64)
+    for b in range(49):
+        if freq[b]:
+            total += ((masks >> np.uint64(b)) & np.uint64(1)).astype(np.int64) * freq[b]
+    return total / (5*nb_hist)
+
+# nom => (dtype, fonction, constantes de config.py dont dépend la valeur, dépend de l'historique)
+METRIQUES = {
+    "somme":                (np.int16,   _calc_somme,               [], False),
+    "somme3f":              (np.int16,   _calc_somme3f,             [], False),
+    "somme3c":              (np.int16,   _calc_somme3c,             [], False),
+    "somme3l":              (np.int16,   _calc_somme3l,             [], False),
+    "variance":             (np.float64, _calc_variance,            [], False),
+    "mediane_ecart":        (np.float32, _calc_mediane_ecart,       [], False),
+    "dizaines_max":         (np.uint8,   _calc_dizaines_max,        [], False),
+    "suite_max":            (np.uint8,   _calc_suite_max,           [], False),
+    "ecart_consecutif_max": (np.uint8,   _calc_ecart_consecutif_max, ["ECART_CONSECUTIF"], False),
+    "qshift_score":         (np.float64, _calc_qshift_score,        ["QSHIFT_TESTBORNE_BOUNDS"], False),
+    "mps_moyenne":          (np.float64, _calc_mps_moyenne,         [], True)
+}
+
+def seuils_filtres():
+    """
+    Filtre => (métrique, borne basse, borne haute) d'après config.py :
+    le filtre vaut 1 ssi borne basse <= métrique <= borne haute.
+    (mps : hors cas limites à 1e-9 près repris par filtre_mps_legacy)
+    """
+    return {
+        "somme":                   ("somme", config.SOMME_MIN, config.SOMME_MAX),
+        "dizaines":                ("dizaines_max", 0, config.DIZAINES_MAX),
+        "suite":                   ("suite_max", 0, config.SUITE_MAX),
+        "mediane":                 ("mediane_ecart", config.MEDIAN_MIN, config.MEDIAN_MAX),
+        "variance":                ("variance", config.VARIANCE_MIN, config.VARIANCE_MAX),
+        "ecart":                   ("mediane_ecart", config.ECART_MIN, config.ECART_MAX),
+        "ecart_consecutif":        ("ecart_consecutif_max", 0, config.ECART_CONSECUTIF[2]),
+        "quartileshift_testborne": ("qshift_score",) + tuple(config.QSHIFT_TESTBORNE_SCORE_95),
+        "mps":                     ("mps_moyenne", config.MPS_MIN, config.MPS_MAX),
+        "somme3f":                 ("somme3f", config.SOMME3F_MIN, config.SOMME3F_MAX),
+        "somme3c":                 ("somme3c", config.SOMME3C_MIN, config.SOMME3C_MAX),
+        "somme3l":                 ("somme3l", config.SOMME3L_MIN, config.SOMME3L_MAX)
+    }
+
+def _chemin(nom, historique=None):
+    _, _, constantes, avec_hist = METRIQUES[nom]
+    if not constantes and not avec_hist:
+        return os.path.join(config.METRIQUES_DIR, f"{nom}.npy")
+    h = hashlib.sha1()
+    for cst in constantes:
+        h.update(f"{cst}={getattr(config, cst)!r}|".encode())
+    if avec_hist:
+        h.update(np.asarray(list(historique or []), dtype=np.uint64).tobytes())
+    return os.path.join(config.METRIQUES_DIR, f"{nom}_{h.hexdigest()[:16]}.npy")
+
+def _chemin_histo(nom, historique=None):
+    return _chemin(nom, historique)[:-len(".npy")] + "_histo.npz"
+
+def _sauver_histogramme(nom, historique, valeurs):
+    """
+    Écrit (valeurs distinctes triées, effectifs) de la métrique à côté de sa .npy.
+    """
+    distinctes, effectifs = np.unique(valeurs, return_counts=True)
+    chemin = _chemin_histo(nom, historique)
+    np.savez(chemin + ".tmp.npz", valeurs=distinctes, effectifs=effectifs)
+    os.replace(chemin + ".tmp.npz", chemin)
+    return distinctes, effectifs
+
+def calculer_metriques(historique=None, noms=None, chunk_size=None):
+    """
+    Calcule (une fois) les métriques manquantes sur tout l'univers, par tranches de rangs.
+    Renvoie la liste des métriques calculées.
+    """
+    if noms is None:
+        noms = [n for n in METRIQUES if not METRIQUES[n][3] or historique is not None]
+    if chunk_size is None:
+        chunk_size = config.CHUNK_SIZE_SCAN
+    a_calculer = [n for n in noms if not os.path.exists(_chemin(n, historique))]
+    if not a_calculer:
+        return []
+    os.makedirs(config.METRIQUES_DIR, exist_ok=True)
+    hist = list(historique or [])
+    ctx = {"freq": mps_histogramme(hist), "nb_hist": len(hist)}
+    sorties = {}
+    for nom in a_calculer:
+        tmp = _chemin(nom, historique) + ".tmp"
+        sorties[nom] = np.lib.format.open_memmap(tmp, mode="w+", dtype=METRIQUES[nom][0],
+                                                 shape=(NB_COMBINAISONS,))
+    for debut in range(0, NB_COMBINAISONS, chunk_size):
+        fin = min(debut+chunk_size, NB_COMBINAISONS)
+        arr, masks = lot_tranche(debut, fin)
+        for nom in a_calculer:
+            sorties[nom][debut:fin] = METRIQUES[nom][1](arr, masks, ctx)
+    for nom in a_calculer:
+        sorties[nom].flush()
+        _sauver_histogramme(nom, historique, sorties[nom])
+        del sorties[nom]
+        os.replace(_chemin(nom, historique) + ".tmp", _chemin(nom, historique))
+        logger.info(f"Métrique '{nom}' calculée.")
+    return a_calculer
+
+def charger_metrique(nom, historique=None):
+    """
+    Vecteur (N,) de la métrique en lecture seule (np.memmap), calculé si absent.
+    """
+    if METRIQUES[nom][3] and historique is None:
+        raise ValueError(f"La métrique '{nom}' dépend de l'historique.")
+    chemin = _chemin(nom, historique)
+    if not os.path.exists(chemin):
+        calculer_metriques(historique, [nom])
+    return np.load(chemin, mmap_mode="r")
+
+def histogramme(nom, historique=None):
+    """
+    (valeurs distinctes triées, effectifs) de la métrique, lus dans le fichier
+    écrit par calculer_metriques (recalculé une fois s'il manque).
+    """
+    chemin = _chemin_histo(nom, historique)
+    if not os.path.exists(chemin):
+        return _sauver_histogramme(nom, historique, charger_metrique(nom, historique))
+    with np.load(chemin) as h:
+        return h["valeurs"], h["effectifs"]
+
+def compter_intervalle(nom, borne_min, borne_max, historique=None):
+    """
+    Nb de combinaisons avec borne_min <= métrique <= borne_max, via l'histogramme.
+    """
+    valeurs, effectifs = histogramme(nom, historique)
+    i = np.searchsorted(valeurs, borne_min, side="left")
+    j = np.searchsorted(valeurs, borne_max, side="right")
+    return int(effectifs[i:j].sum())
+
+def balayage(nom, bornes, historique=None):
+    """
+    [(borne_min, borne_max, nb)] pour une série de bornes : un seul histogramme
+    et des sommes cumulées, quelques ms pour des centaines de seuils.
+    """
+    valeurs, effectifs = histogramme(nom, historique)
+    cumul = np.concatenate([[0], np.cumsum(effectifs)])
+    res = []
+    for lo, hi in bornes:
+        i = np.searchsorted(valeurs, lo, side="left")
+        j = np.searchsorted(valeurs, hi, side="right")
+        res.append((lo, hi, int(cumul[j]-cumul[i])))
+    return res
+
+def masque_filtres(seuils=None, filtres=None, historique=None):
+    """
+    Vecteur booléen (N,) : passe tous les 'filtres' (par défaut ceux de 'seuils'),
+    avec les bornes de config.py remplacées par 'seuils' = {filtre: (min, max)}.
+    """
+    seuils = seuils or {}
+    defaut = seuils_filtres()
+    if filtres is None:
+        filtres = list(seuils)
+    ok = np.ones(NB_COMBINAISONS, dtype=bool)
+    for f in filtres:
+        metrique, lo, hi = defaut[f]
+        lo, hi = seuils.get(f, (lo, hi))
+        m = charger_metrique(metrique, historique if f=="mps" else None)
+        ok &= (m>=lo) & (m<=hi)
+    return ok
+
+def compter_passes(seuils=None, filtres=None, historique=None):
+    """
+    ex. compter_passes({"variance": (20, 300)})
+        compter_passes({"variance": (20, 300)}, filtres=["somme", "variance"])
+    """
+    return int(masque_filtres(seuils, filtres, historique).sum())
+
+def main(args):
+    if len(args)==3:
+        nom, lo, hi = args[0], float(args[1]), float(args[2])
+        t = time.time()
+        nb = compter_intervalle(nom, lo, hi)
+        print(f"{lo} <= {nom} <= {hi} : {nb} combinaisons ({(time.time()-t)*1000:.0f} ms)")
+        return
+    t = time.time()
+    faites = calculer_metriques()
+    print(f"Métriques calculées : {', '.join(faites) or 'aucune (déjà présentes)'} "
+          f"({time.time()-t:.1f} s)")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main(sys.argv[1:])
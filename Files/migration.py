@@ -0,0 +1,146 @@
+# migration.py
+"""
+Migration en place des anciennes bases CombinaisonLotoTest*.db.
+
+Avant : les tables de combinaisons stockaient "boules" en TEXT ("(1, 2, 3, 4, 5)"),
+relu à chaque étape avec eval().
+Après : 5 colonnes INTEGER boule1..boule5 + bitmask (+ rang), et des vues
+'<Table>_Texte' qui recomposent l'ancienne colonne texte pour la compatibilité.
+
+Combinaisons_Filtrees est aussi ré-indexée : id = rang combinatoire (ranking.py).
+
+Usage :
+    python migration.py                 => toutes les bases CombinaisonLotoTest*.db du répertoire
+    python migration.py base1.db ...    => bases données en argument
+"""
+
+import os
+import sys
+import logging
+from functools import lru_cache
+from config import BDD_NAME_PREFIX
+from ranking import rank_combinaison
+from utils import (
+    create_connection,
+    create_tables,
+    create_vues_boules_texte,
+    comb_to_bitmask,
+    TABLES_BOULES
+)
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=8)
+def _parse_boules(txt):
+    # un seul parsing par ligne, réutilisé par les 7 appels SQL de cette ligne
+    return tuple(sorted(int(x) for x in txt.strip("()[] ").split(",")))
+
+def _register_fonctions_migration(conn):
+    conn.create_function("mig_boule", 2, lambda txt, i: _parse_boules(txt)[i-1], deterministic=True)
+    conn.create_function("mig_rang", 1, lambda txt: rank_combinaison(_parse_boules(txt)), deterministic=True)
+    conn.create_function("mig_bitmask", 1, lambda txt: comb_to_bitmask(_parse_boules(txt)), deterministic=True)
+
+def _colonnes(conn, table):
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+def tables_a_migrer(conn):
+    """
+    Tables de combinaisons encore au format texte (colonne 'boules').
+    """
+    return [t for t in TABLES_BOULES if "boules" in _colonnes(conn, t)]
+
+def migrer_table(conn, table):
+    """
+    Renomme l'ancienne table, recrée le nouveau schéma, recopie les lignes
+    en convertissant 'boules' en colonnes typées. Renvoie le nb de lignes copiées.
+    """
+    cursor = conn.cursor()
+    anciennes = _colonnes(conn, table)
+    ancienne_table = f"{table}_avant_migration"
+    cursor.execute(f"DROP TABLE IF EXISTS {ancienne_table}")
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {ancienne_table}")
+    create_tables(conn, vues_texte=False)
+    nouvelles = _colonnes(conn, table)
+
+    cols_dst = []
+    cols_src = []
+    if table == "Combinaisons_Filtrees":
+        cols_dst.append("id")
+        cols_src.append("mig_rang(boules)")
+    else:
+        cols_dst += ["id", "rang"]
+        cols_src += ["id", "mig_rang(boules)"]
+    for i in range(1, 6):
+        cols_dst.append(f"boule{i}")
+        cols_src.append(f"mig_boule(boules, {i})")
+    cols_dst.append("bitmask")
+    cols_src.append("mig_bitmask(boules)")
+
+    # colonnes de filtres communes (noms insensibles à la casse en SQLite)
+    nouvelles_min = {c.lower(): c for c in nouvelles}
+    deja = {c.lower() for c in cols_dst}
+    for col in anciennes:
+        low = col.lower()
+        if low in nouvelles_min and low not in deja and low != "boules":
+            cols_dst.append(nouvelles_min[low])
+            cols_src.append(col)
+
+    cursor.execute(f"""
+      INSERT INTO {table}({", ".join(cols_dst)})
+      SELECT {", ".join(cols_src)} FROM {ancienne_table}
+      WHERE boules IS NOT NULL AND boules<>''
+    """)
+    nb = cursor.rowcount
+    cursor.execute(f"DROP TABLE {ancienne_table}")
+    conn.commit()
+    return nb
+
+def migrer_connexion(conn, vues_texte=True):
+    """
+    Migre toutes les tables texte de la base ouverte sur 'conn'.
+    Renvoie la liste des tables migrées (vide si la base est déjà à jour).
+    """
+    a_migrer = tables_a_migrer(conn)
+    if not a_migrer:
+        return []
+    _register_fonctions_migration(conn)
+    # les vues référencent les tables par leur nom => on les recrée après
+    for table in TABLES_BOULES:
+        conn.execute(f"DROP VIEW IF EXISTS {table}_Texte")
+    for table in a_migrer:
+        nb = migrer_table(conn, table)
+        print(f"{table} migrée ({nb} lignes).")
+        logger.info(f"Migration {table} : {nb} lignes.")
+    if vues_texte:
+        create_vues_boules_texte(conn)
+    return a_migrer
+
+def migrer_base(db_file, vues_texte=True):
+    """
+    Ouvre 'db_file' et la migre. Sans effet si la base est déjà à jour.
+    """
+    conn = create_connection(db_file)
+    if not conn:
+        return False
+    try:
+        if not migrer_connexion(conn, vues_texte):
+            print(f"{db_file} : déjà au format colonnes typées.")
+        return True
+    finally:
+        conn.close()
+
+def main(args):
+    fichiers = args or sorted(
+        f for f in os.listdir() if f.startswith(BDD_NAME_PREFIX) and f.endswith(".db")
+    )
+    if not fichiers:
+        print("Aucune base à migrer.")
+        return
+    for f in fichiers:
+        migrer_base(f)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main(sys.argv[1:])
@@ -0,0 +1,22 @@
+# profils.py
+"""
+Profils de connexion SQLite (PRAGMA de config.PROFILS_CONNEXION).
+Module sans dépendance lourde : utilisable par les scripts autonomes
+(GainCalculatorLoto.py) sans charger utils.
+"""
+
+import logging
+from config import PROFILS_CONNEXION
+
+logger = logging.getLogger(__name__)
+
+def appliquer_profil(conn, profil):
+    """
+    Applique les PRAGMA du profil (config.PROFILS_CONNEXION) sur une connexion
+    ouverte : une étape peut ainsi passer en "bulk" puis revenir en "read".
+    """
+    if profil not in PROFILS_CONNEXION:
+        raise ValueError(f"Profil de connexion inconnu : {profil}")
+    for pragma, val in PROFILS_CONNEXION[profil].items():
+        conn.execute(f"PRAGMA {pragma}={val}")
+    logger.info(f"Profil de connexion '{profil}' appliqué.")
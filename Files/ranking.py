@@ -0,0 +1,85 @@
+# ranking.py
+"""
+Système de numération combinatoire pour les combinaisons 5 boules sur 49.
+
+Chaque combinaison triée (c1<c2<c3<c4<c5) correspond à un rang dense
+0..1 906 883 dans l'ordre lexicographique, c'est-à-dire l'ordre de
+itertools.combinations(range(1,50), 5) :
+    (1,2,3,4,5)      => 0
+    (45,46,47,48,49) => 1 906 883
+
+rang = C(49,5) - 1 - somme_i C(49 - c_i, 5 - i + 1)
+
+Le rang sert d'identifiant (id) dans Combinaisons_Filtrees : un accès,
+une jointure ou un tirage aléatoire devient un simple calcul.
+"""
+
+import numpy as np
+from math import comb
+
+NB_BOULES = 49
+NB_TIRES = 5
+NB_COMBINAISONS = comb(NB_BOULES, NB_TIRES)
+
+# _TABLE_RANG[i][v] = C(49 - v, 5 - i) pour la position i (0..4), boule v (0..49)
+_TABLE_RANG = np.array(
+    [[comb(NB_BOULES - v, NB_TIRES - i) for v in range(NB_BOULES + 1)]
+     for i in range(NB_TIRES)],
+    dtype=np.int64
+)
+
+# _TABLE_BINOM[k] = [C(0,k), C(1,k), ..., C(48,k)] (croissant) pour le décodage
+_TABLE_BINOM = np.array(
+    [[comb(d, k) for d in range(NB_BOULES)] for k in range(NB_TIRES + 1)],
+    dtype=np.int64
+)
+
+def rank_combinaison(comb_):
+    """
+    Combinaison (5 boules, triée ou non) => rang 0..NB_COMBINAISONS-1.
+    """
+    c = sorted(int(x) for x in comb_)
+    r = 0
+    for i, v in enumerate(c):
+        r += comb(NB_BOULES - v, NB_TIRES - i)
+    return NB_COMBINAISONS - 1 - r
+
+def unrank_combinaison(rang):
+    """
+    Rang => tuple de 5 boules triées.
+    """
+    rang = int(rang)
+    if not 0 <= rang < NB_COMBINAISONS:
+        raise ValueError(f"Rang hors limites : {rang}")
+    reste = NB_COMBINAISONS - 1 - rang
+    res = []
+    for k in range(NB_TIRES, 0, -1):
+        d = int(np.searchsorted(_TABLE_BINOM[k], reste, side="right")) - 1
+        reste -= comb(d, k)
+        res.append(NB_BOULES - d)
+    return tuple(res)
+
+def rank_batch(arr):
+    """
+    Tableau (N,5) de boules triées => vecteur (N,) int64 de rangs.
+    """
+    arr = np.asarray(arr)
+    total = np.zeros(len(arr), dtype=np.int64)
+    for i in range(NB_TIRES):
+        total += _TABLE_RANG[i][arr[:, i].astype(np.int64)]
+    return (NB_COMBINAISONS - 1) - total
+
+def unrank_batch(rangs):
+    """
+    Vecteur de rangs => tableau (N,5) uint8 de boules triées.
+    """
+    rangs = np.asarray(rangs, dtype=np.int64)
+    if len(rangs) and (rangs.min() < 0 or rangs.max() >= NB_COMBINAISONS):
+        raise ValueError("Rang hors limites.")
+    reste = (NB_COMBINAISONS - 1) - rangs
+    out = np.empty((len(rangs), NB_TIRES), dtype=np.uint8)
+    for pos, k in enumerate(range(NB_TIRES, 0, -1)):
+        d = np.searchsorted(_TABLE_BINOM[k], reste, side="right") - 1
+        reste = reste - _TABLE_BINOM[k][d]
+        out[:, pos] = NB_BOULES - d
+    return out
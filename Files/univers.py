@@ -0,0 +1,115 @@
+# univers.py
+"""
+Fichier binaire de l'univers des 1 906 884 combinaisons, dans l'ordre des rangs.
+
+Disposition fixe (little endian) :
+    [0, 16)          en-tête : b"LOTO5S49" + uint64 N
+    [16, 16+5N)      boules   : N x 5 uint8 (triées)
+    [OFFSET_MASKS, +8N) bitmasks : N uint64 (bit x-1 pour la boule x)
+OFFSET_MASKS = 16 + 5N arrondi au multiple de 8 suivant.
+
+~25 Mo au total, écrit une fois (generate_combinations_in_filtrees ou
+'python univers.py'), puis relu sans copie par np.memmap : ligne i = rang i = id
+dans Combinaisons_Filtrees. Les étapes filtres / MPS / heuristiques n'ont alors
+plus besoin de lire les boules ni le bitmask dans SQLite.
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import config
+from ranking import NB_COMBINAISONS, NB_TIRES, unrank_batch
+from filters import boules_to_bitmask_batch
+
+MAGIQUE = b"LOTO5S49"
+TAILLE_ENTETE = 16
+OFFSET_BOULES = TAILLE_ENTETE
+OFFSET_MASKS = (OFFSET_BOULES + NB_TIRES*NB_COMBINAISONS + 7) // 8 * 8
+TAILLE_FICHIER = OFFSET_MASKS + 8*NB_COMBINAISONS
+
+# (chemin, mtime) => (boules, masks) déjà ouverts
+_OUVERTS = {}
+
+def ecrire_univers(chemin=None, chunk_size=None):
+    """
+    Écrit le fichier de l'univers (par tranches de rangs, via un .tmp).
+    """
+    chemin = chemin or config.UNIVERS_FILE
+    chunk_size = chunk_size or config.CHUNK_SIZE_SCAN
+    tmp = chemin + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIQUE + np.uint64(NB_COMBINAISONS).tobytes())
+        f.truncate(TAILLE_FICHIER)
+    boules = np.memmap(tmp, dtype=np.uint8, mode="r+", offset=OFFSET_BOULES,
+                       shape=(NB_COMBINAISONS, NB_TIRES))
+    masks = np.memmap(tmp, dtype="<u8", mode="r+", offset=OFFSET_MASKS,
+                      shape=(NB_COMBINAISONS,))
+    for debut in range(0, NB_COMBINAISONS, chunk_size):
+        fin = min(debut+chunk_size, NB_COMBINAISONS)
+        arr = unrank_batch(np.arange(debut, fin))
+        boules[debut:fin] = arr
+        masks[debut:fin] = boules_to_bitmask_batch(arr)
+    boules.flush()
+    masks.flush()
+    del boules, masks
+    os.replace(tmp, chemin)
+    _OUVERTS.clear()
+    return chemin
+
+def univers_valide(chemin=None):
+    chemin = chemin or config.UNIVERS_FILE
+    if not os.path.exists(chemin) or os.path.getsize(chemin) != TAILLE_FICHIER:
+        return False
+    with open(chemin, "rb") as f:
+        entete = f.read(TAILLE_ENTETE)
+    return entete == MAGIQUE + np.uint64(NB_COMBINAISONS).tobytes()
+
+def ouvrir_univers(chemin=None):
+    """
+    (boules (N,5) uint8, bitmasks (N,) uint64) en np.memmap lecture seule,
+    ou None si le fichier est absent ou invalide.
+    """
+    chemin = chemin or config.UNIVERS_FILE
+    if not univers_valide(chemin):
+        return None
+    cle = (chemin, os.path.getmtime(chemin))
+    if cle not in _OUVERTS:
+        _OUVERTS.clear()
+        boules = np.memmap(chemin, dtype=np.uint8, mode="r", offset=OFFSET_BOULES,
+                           shape=(NB_COMBINAISONS, NB_TIRES))
+        masks = np.memmap(chemin, dtype="<u8", mode="r", offset=OFFSET_MASKS,
+                          shape=(NB_COMBINAISONS,))
+        _OUVERTS[cle] = (boules, masks)
+    return _OUVERTS[cle]
+
+def univers_disponible():
+    return config.UNIVERS_BINAIRE and ouvrir_univers() is not None
+
+def lot_rangs(rangs):
+    """
+    Rangs quelconques => (boules (n,5) uint8, bitmasks (n,) uint64),
+    lus dans le fichier s'il existe, sinon calculés (unrank_batch).
+    """
+    rangs = np.asarray(rangs, dtype=np.int64)
+    u = ouvrir_univers() if config.UNIVERS_BINAIRE else None
+    if u is not None:
+        return u[0][rangs], u[1][rangs]
+    arr = unrank_batch(rangs)
+    return arr, boules_to_bitmask_batch(arr)
+
+def lot_tranche(debut, fin):
+    """
+    Rangs debut..fin-1 => (boules, bitmasks) : vues sur le memmap, sans copie.
+    """
+    u = ouvrir_univers() if config.UNIVERS_BINAIRE else None
+    if u is not None:
+        return u[0][debut:fin], u[1][debut:fin]
+    arr = unrank_batch(np.arange(debut, fin))
+    return arr, boules_to_bitmask_batch(arr)
+
+if __name__ == "__main__":
+    t = time.time()
+    chemin = sys.argv[1] if len(sys.argv) > 1 else config.UNIVERS_FILE
+    ecrire_univers(chemin)
+    print(f"Univers écrit : {chemin} ({TAILLE_FICHIER/1e6:.1f} Mo, {time.time()-t:.1f} s)")
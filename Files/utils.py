@@ -17,13 +17,29 @@ Structure:
 """
 
 import logging
+import time
 import sqlite3
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import itertools
 import random
 import numpy as np
-from math import comb, ceil
+from math import comb, ceil, floor
 from config import (
+    STOCKAGE_FILTRES,
+    CHUNK_SIZE_SCAN,
+    NB_WORKERS,
+    FILTRES_EN_SQL,
+    CACHE_FILTRES,
+    UNIVERS_BINAIRE,
+    SOMME_MIN, SOMME_MAX,
+    MEDIAN_MIN, MEDIAN_MAX,
+    VARIANCE_MIN, VARIANCE_MAX,
+    ECART_MIN, ECART_MAX,
+    SOMME3F_MIN, SOMME3F_MAX,
+    SOMME3C_MIN, SOMME3C_MAX,
+    SOMME3L_MIN, SOMME3L_MAX,
     LOG_FILE,
     LOG_INTERVAL,
     CHUNK_SIZE_MPS,
@@ -44,10 +60,46 @@ from filters import (
     filtre_somme3c,
     filtre_somme3l,
     filtre_comparatif,
+    filtre_comparatif_batch,
+    mps_histogramme,
+    evaluer_filtre_batch,
+    FILTRES_BATCH,
+    ORDRE_FILTRES,
+    boules_to_bitmask_batch,
     # heuristiques
-    heuristic_4sur5,
-    heuristic_3sur5,
-    heuristic_2sur5
+    heuristic_leaders,
+    raccorder_leaders
+)
+from ranking import rank_batch, NB_COMBINAISONS
+from profils import appliquer_profil
+from cache_filtres import resultat_filtre, charger_resultat, sauver_resultat
+from univers import (
+    ecrire_univers,
+    univers_valide,
+    ouvrir_univers,
+    lot_rangs
+)
+from enumeration import enumerer_combinaisons
+from couverture import couverture_gloutonne, meilleur_recouvrement
+from extraction import (
+    calibrer_filtres,
+    ordre_filtres,
+    extraire_court_circuit,
+    rapport_court_circuit
+)
+from bitmaps import (
+    bitmap_vers_bool,
+    bitmap_depuis_bool,
+    bitmap_depuis_rangs,
+    bitmap_plein,
+    bitmap_et,
+    bitmap_compte,
+    au_moins_k,
+    rangs_depuis_bitmap,
+    reinitialiser_bitmaps,
+    maj_bitmap_filtre,
+    remplacer_bitmap_filtre,
+    charger_bitmaps_filtres
 )
 
 logger = logging.getLogger(__name__)
@@ -56,16 +108,200 @@ logger = logging.getLogger(__name__)
 # BDD
 # ---------------------------------------------------------------------
 
-def create_connection(db_file):
+def create_connection(db_file, profil="defaut"):
     try:
         conn = sqlite3.connect(db_file)
-        logger.info(f"Connexion à '{db_file}' établie.")
+        appliquer_profil(conn, profil)
+        enregistrer_fonctions_sql(conn)
+        logger.info(f"Connexion à '{db_file}' établie (profil {profil}).")
         return conn
     except sqlite3.Error as e:
         logger.error(f"Erreur connexion: {e}")
         return None
 
-def create_tables(conn):
+@contextmanager
+def index_differes(conn, table, prefixe=None):
+    """
+    Supprime les index de 'table' (ou seulement ceux dont le nom commence par
+    'prefixe') le temps d'une écriture massive, puis les reconstruit en une fois
+    (plus rapide que de les maintenir ligne à ligne).
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+      SELECT name, sql FROM sqlite_master
+      WHERE type='index' AND tbl_name=? AND sql IS NOT NULL
+    """, (table,))
+    index = [(nom, sql) for nom, sql in cursor.fetchall()
+             if prefixe is None or nom.startswith(prefixe)]
+    for nom, _ in index:
+        cursor.execute(f"DROP INDEX IF EXISTS {nom}")
+    conn.commit()
+    try:
+        yield
+    finally:
+        for _, sql in index:
+            cursor.execute(sql)
+        conn.commit()
+
+def maj_par_lot(conn, table, colonnes, ids, valeurs, affectations=None):
+    """
+    Mise à jour massive par id : les couples (id, valeurs...) sont chargés dans
+    une table temporaire puis appliqués par une seule jointure
+    (UPDATE ... FROM, SQLite >= 3.33 ; sous-requête corrélée sinon),
+    au lieu d'un UPDATE ... WHERE id=? par ligne.
+    - colonnes : noms des colonnes de valeurs de la table temporaire 'lot'
+    - affectations : {colonne cible: expression SQL utilisant lot.<colonne>},
+      par défaut colonne = lot.colonne
+    Ne fait pas de commit.
+    """
+    ids= np.asarray(ids, dtype=np.int64)
+    if len(ids)==0:
+        return
+    valeurs= np.asarray(valeurs, dtype=np.int64).reshape(len(ids), len(colonnes))
+    if affectations is None:
+        affectations= {c: f"lot.{c}" for c in colonnes}
+    cursor= conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS temp.lot")
+    cursor.execute(f"""
+      CREATE TEMP TABLE lot(
+        id INTEGER PRIMARY KEY,
+        {", ".join(f"{c} INTEGER" for c in colonnes)}
+      )
+    """)
+    # ids triés => insertion en fin de B-tree
+    ordre= np.argsort(ids, kind="stable")
+    cursor.executemany(
+        f"INSERT INTO lot VALUES ({','.join(['?']*(1+len(colonnes)))})",
+        np.column_stack([ids[ordre], valeurs[ordre]]).tolist()
+    )
+    if sqlite3.sqlite_version_info >= (3, 33, 0):
+        set_sql= ", ".join(f"{c}={expr}" for c, expr in affectations.items())
+        cursor.execute(f"""
+          UPDATE {table} SET {set_sql}
+          FROM lot WHERE {table}.id = lot.id
+        """)
+    else:
+        set_sql= ", ".join(
+            f"{c}=(SELECT {expr} FROM lot WHERE lot.id={table}.id)"
+            for c, expr in affectations.items()
+        )
+        cursor.execute(f"""
+          UPDATE {table} SET {set_sql}
+          WHERE id IN (SELECT id FROM lot)
+        """)
+    cursor.execute("DROP TABLE temp.lot")
+
+# ---------------------------------------------------------------------
+# Fonctions SQL (UDF) : filtres utilisables directement dans les requêtes
+# ---------------------------------------------------------------------
+
+def enregistrer_fonctions_sql(conn):
+    """
+    Enregistre sur la connexion :
+      - popcount(x)
+      - filtre_<nom>(b1,b2,b3,b4,b5) => 0/1 pour les 11 filtres sur les boules
+    ex. SELECT COUNT(*) FROM Combinaisons_Filtrees
+        WHERE filtre_somme(boule1,boule2,boule3,boule4,boule5)=1
+    """
+    from filters import (
+        filtre_somme, filtre_dizaines, filtre_suite, filtre_mediane,
+        filtre_variance, filtre_ecart, filtre_ecart_consecutif,
+        filtre_quartileshift_testBorne,
+        filtre_somme3f, filtre_somme3c, filtre_somme3l
+    )
+    conn.create_function("popcount", 1, lambda x: bin(x).count("1") if x is not None else None,
+                         deterministic=True)
+    for nom, func in {
+        "somme": filtre_somme,
+        "dizaines": filtre_dizaines,
+        "suite": filtre_suite,
+        "mediane": filtre_mediane,
+        "variance": filtre_variance,
+        "ecart": filtre_ecart,
+        "ecart_consecutif": filtre_ecart_consecutif,
+        "quartileshift_testborne": filtre_quartileshift_testBorne,
+        "somme3f": filtre_somme3f,
+        "somme3c": filtre_somme3c,
+        "somme3l": filtre_somme3l
+    }.items():
+        conn.create_function(f"filtre_{nom}", 5, lambda *b, f=func: int(f(b)), deterministic=True)
+
+def enregistrer_fonctions_historique(conn, historique):
+    """
+    Fonctions dépendant de l'historique : filtre_mps(bitmask), filtre_comparatif(bitmask).
+    À ré-enregistrer si l'historique change.
+    """
+    from filters import filtre_mps_scalaire, filtre_comparatif
+    hist= list(historique)
+    freq= mps_histogramme(hist)
+    last10= hist[-10:] if len(hist)>=10 else []
+    conn.create_function("filtre_mps", 1,
+                         lambda m: filtre_mps_scalaire(m, hist, freq),
+                         deterministic=True)
+    conn.create_function("filtre_comparatif", 1,
+                         lambda m: filtre_comparatif(m, last10, threshold=3),
+                         deterministic=True)
+
+def recalculer_nb_filtres(conn):
+    """
+    nb_filtres_passes = somme des 13 colonnes (mode colonnes ; en mode bitfield
+    c'est le popcount calculé par la vue).
+    """
+    if mode_stockage(conn)=="bitfield":
+        return
+    conn.execute("""
+      UPDATE Combinaisons_Filtrees
+      SET nb_filtres_passes = (
+         filtre_somme + filtre_dizaines + filtre_suite + filtre_mediane +
+         filtre_variance + filtre_ecart + filtre_ecart_consecutif +
+         filtre_quartileshift_testborne + filtre_mps +
+         filtre_somme3f + filtre_somme3c + filtre_somme3l + filtre_comparatif
+      )
+    """)
+
+def iter_chunks(conn, table, columns, chunk_size=None, numpy=True):
+    """
+    Parcourt 'table' par pages de chunk_size lignes, en pagination par clé
+    (WHERE id > dernier id ORDER BY id LIMIT ?) : chaque page coûte le même prix
+    quelle que soit sa position, contrairement à LIMIT/OFFSET.
+    Chaque page est lue entièrement avant d'être rendue : on peut écrire
+    dans la table entre deux pages.
+    - columns : expressions SQL (ex. "IFNULL(filtre_mps,0)")
+    - renvoie des tableaux int64 (N, 1+nb colonnes), colonne 0 = id,
+      ou des listes de tuples (id, ...) si numpy=False
+    """
+    if chunk_size is None:
+        chunk_size= CHUNK_SIZE_SCAN
+    cursor= conn.cursor()
+    sql= f"""
+      SELECT id, {", ".join(columns)} FROM {table}
+      WHERE id > ? ORDER BY id LIMIT ?
+    """
+    dernier= -1
+    while True:
+        cursor.execute(sql, (dernier, chunk_size))
+        rows= cursor.fetchall()
+        if not rows:
+            return
+        dernier= rows[-1][0]
+        if numpy:
+            yield np.array(rows, dtype=np.int64).reshape(-1, len(cursor.description))
+        else:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+
+# Tables de combinaisons stockant les 5 boules en colonnes INTEGER
+TABLES_COMBOS_SIMPLES = [
+    "CombinaisonsExtraites",
+    "Heuristique4sur5",
+    "Heuristique3sur5",
+    "Heuristique2sur5"
+]
+TABLES_BOULES = ["Combinaisons_Filtrees", "StatsCombinaisons"] + TABLES_COMBOS_SIMPLES
+COLS_BOULES = "boule1, boule2, boule3, boule4, boule5"
+
+def create_tables(conn, vues_texte=True):
     cursor = conn.cursor()
     cursor.execute("""
        CREATE TABLE IF NOT EXISTS Historique(
@@ -100,31 +336,50 @@ def create_tables(conn):
          nb_filtres_passes INTEGER
        )
     """)
-    cursor.execute("""
-       CREATE TABLE IF NOT EXISTS Combinaisons_Filtrees(
-         id INTEGER PRIMARY KEY AUTOINCREMENT,
-         boules TEXT,
-         bitmask INTEGER,
-         filtre_somme INTEGER DEFAULT 0,
-         filtre_dizaines INTEGER DEFAULT 0,
-         filtre_suite INTEGER DEFAULT 0,
-         filtre_mediane INTEGER DEFAULT 0,
-         filtre_variance INTEGER DEFAULT 0,
-         filtre_ecart INTEGER DEFAULT 0,
-         filtre_ecart_consecutif INTEGER DEFAULT 0,
-         filtre_quartileshift_testBorne INTEGER DEFAULT 0,
-         filtre_mps INTEGER DEFAULT 0,
-         filtre_somme3f INTEGER DEFAULT 0,
-         filtre_somme3c INTEGER DEFAULT 0,
-         filtre_somme3l INTEGER DEFAULT 0,
-         filtre_comparatif INTEGER DEFAULT 0,
-         nb_filtres_passes INTEGER DEFAULT 0
-       )
-    """)
+    mode= mode_stockage(conn) or STOCKAGE_FILTRES
+    if mode=="bitfield":
+        create_tables_bitfield(conn)
+    else:
+        cursor.execute("""
+           CREATE TABLE IF NOT EXISTS Combinaisons_Filtrees(
+             id INTEGER PRIMARY KEY, -- rang combinatoire (ranking.py)
+             boule1 INTEGER,
+             boule2 INTEGER,
+             boule3 INTEGER,
+             boule4 INTEGER,
+             boule5 INTEGER,
+             bitmask INTEGER,
+             filtre_somme INTEGER DEFAULT 0,
+             filtre_dizaines INTEGER DEFAULT 0,
+             filtre_suite INTEGER DEFAULT 0,
+             filtre_mediane INTEGER DEFAULT 0,
+             filtre_variance INTEGER DEFAULT 0,
+             filtre_ecart INTEGER DEFAULT 0,
+             filtre_ecart_consecutif INTEGER DEFAULT 0,
+             filtre_quartileshift_testBorne INTEGER DEFAULT 0,
+             filtre_mps INTEGER DEFAULT 0,
+             filtre_somme3f INTEGER DEFAULT 0,
+             filtre_somme3c INTEGER DEFAULT 0,
+             filtre_somme3l INTEGER DEFAULT 0,
+             filtre_comparatif INTEGER DEFAULT 0,
+             nb_filtres_passes INTEGER DEFAULT 0
+           )
+        """)
+        # extraction_seuil : WHERE nb_filtres_passes>=?
+        cursor.execute("""
+           CREATE INDEX IF NOT EXISTS idx_combinaisons_nb
+           ON Combinaisons_Filtrees(nb_filtres_passes)
+        """)
     cursor.execute("""
        CREATE TABLE IF NOT EXISTS StatsCombinaisons(
          id INTEGER PRIMARY KEY AUTOINCREMENT,
-         boules TEXT,
+         rang INTEGER,
+         boule1 INTEGER,
+         boule2 INTEGER,
+         boule3 INTEGER,
+         boule4 INTEGER,
+         boule5 INTEGER,
+         bitmask INTEGER,
          filtre_somme INTEGER,
          filtre_dizaines INTEGER,
          filtre_suite INTEGER,
@@ -141,18 +396,194 @@ def create_tables(conn):
          nb_filtres_passes INTEGER
        )
     """)
+    # CombinaisonsExtraites + Heuristique*sur5 : même schéma (rang + 5 boules + bitmask)
+    for table in TABLES_COMBOS_SIMPLES:
+        cursor.execute(f"""
+           CREATE TABLE IF NOT EXISTS {table}(
+             id INTEGER PRIMARY KEY AUTOINCREMENT,
+             rang INTEGER,
+             boule1 INTEGER,
+             boule2 INTEGER,
+             boule3 INTEGER,
+             boule4 INTEGER,
+             boule5 INTEGER,
+             bitmask INTEGER
+           )
+        """)
+
+    conn.commit()
+    ensure_colonnes_generees(conn)
+    if vues_texte:
+        create_vues_boules_texte(conn)
+    logger.info("Tables créées ou déjà existantes.")
+
+def mode_stockage(conn):
+    """
+    Mode de stockage des résultats de filtres :
+      - "colonnes" : table Combinaisons_Filtrees (13 colonnes 0/1 + nb_filtres_passes)
+      - "bitfield" : table Combinaisons_Flags (une colonne filter_flags, 1 bit par filtre)
+                     + vue de compatibilité Combinaisons_Filtrees
+      - None       : base vide
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT type FROM sqlite_master WHERE name='Combinaisons_Filtrees'")
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return "bitfield" if row[0]=="view" else "colonnes"
+
+def create_tables_bitfield(conn):
+    """
+    Stockage compact : filter_flags = somme des (filtre_j << j), j = index dans ORDRE_FILTRES.
+    La vue Combinaisons_Filtrees expose les anciens noms de colonnes ; nb_filtres_passes
+    y est le popcount (SWAR 16 bits) de filter_flags.
+    """
+    cursor = conn.cursor()
     cursor.execute("""
-       CREATE TABLE IF NOT EXISTS CombinaisonsExtraites(
-         id INTEGER PRIMARY KEY AUTOINCREMENT,
-         boules TEXT
+       CREATE TABLE IF NOT EXISTS Combinaisons_Flags(
+         id INTEGER PRIMARY KEY, -- rang combinatoire (ranking.py)
+         boule1 INTEGER,
+         boule2 INTEGER,
+         boule3 INTEGER,
+         boule4 INTEGER,
+         boule5 INTEGER,
+         bitmask INTEGER,
+         filter_flags INTEGER DEFAULT 0
+       )
+    """)
+    cols_bits = ",\n".join(
+        f"             (filter_flags>>{j})&1 AS filtre_{nom}" for j,nom in enumerate(ORDRE_FILTRES)
+    )
+    cursor.execute(f"""
+       CREATE VIEW IF NOT EXISTS Combinaisons_Filtrees AS
+       SELECT id, boule1, boule2, boule3, boule4, boule5, bitmask, filter_flags,
+{cols_bits},
+             (p4 + (p4>>8)) & 31 AS nb_filtres_passes
+       FROM (
+         SELECT *, (p2 + (p2>>4)) & 3855 AS p4 FROM (
+           SELECT *, (p1 & 13107) + ((p1>>2) & 13107) AS p2 FROM (
+             SELECT *, filter_flags - ((filter_flags>>1) & 21845) AS p1
+             FROM Combinaisons_Flags
+           )
+         )
        )
     """)
-    cursor.execute("CREATE TABLE IF NOT EXISTS Heuristique4sur5(id INTEGER PRIMARY KEY AUTOINCREMENT, boules TEXT)")
-    cursor.execute("CREATE TABLE IF NOT EXISTS Heuristique3sur5(id INTEGER PRIMARY KEY AUTOINCREMENT, boules TEXT)")
-    cursor.execute("CREATE TABLE IF NOT EXISTS Heuristique2sur5(id INTEGER PRIMARY KEY AUTOINCREMENT, boules TEXT)")
 
+def convertir_stockage_bitfield(conn):
+    """
+    Convertit une base en mode "colonnes" vers le mode "bitfield" (flags conservés).
+    """
+    if mode_stockage(conn)!="colonnes":
+        return False
+    cursor = conn.cursor()
+    cursor.execute("DROP VIEW IF EXISTS Combinaisons_Filtrees_Texte")
+    cursor.execute("ALTER TABLE Combinaisons_Filtrees RENAME TO Combinaisons_Filtrees_colonnes")
+    create_tables_bitfield(conn)
+    packed = " | ".join(f"(IFNULL(filtre_{nom},0)<<{j})" for j,nom in enumerate(ORDRE_FILTRES))
+    cursor.execute(f"""
+      INSERT INTO Combinaisons_Flags(id, {COLS_BOULES}, bitmask, filter_flags)
+      SELECT id, {COLS_BOULES}, bitmask, {packed} FROM Combinaisons_Filtrees_colonnes
+    """)
+    cursor.execute("DROP TABLE Combinaisons_Filtrees_colonnes")
+    conn.commit()
+    ensure_colonnes_generees(conn)
+    create_vues_boules_texte(conn)
+    logger.info("Combinaisons_Filtrees convertie en stockage bitfield.")
+    return True
+
+def table_physique(conn):
+    """
+    Table qui stocke réellement les combinaisons (Combinaisons_Filtrees est une vue
+    en mode bitfield).
+    """
+    return "Combinaisons_Flags" if mode_stockage(conn)=="bitfield" else "Combinaisons_Filtrees"
+
+# Colonnes générées (VIRTUAL) calculées par SQLite à partir des boules.
+# variance_num = 25 * variance (np.var), mediane_ecart2 = 2 * médiane des 4 écarts :
+# deux entiers exacts, équivalents aux filtres flottants sur tout l'univers.
+_ECARTS = "boule2-boule1, boule3-boule2, boule4-boule3, boule5-boule4"
+COLONNES_GENEREES = {
+    "somme":          "boule1+boule2+boule3+boule4+boule5",
+    "somme3f":        "boule1+boule2+boule3",
+    "somme3c":        "boule2+boule3+boule4",
+    "somme3l":        "boule3+boule4+boule5",
+    "variance_num":   "5*(boule1*boule1+boule2*boule2+boule3*boule3+boule4*boule4+boule5*boule5)"
+                      " - (boule1+boule2+boule3+boule4+boule5)*(boule1+boule2+boule3+boule4+boule5)",
+    "mediane_ecart2": f"(boule5-boule1) - max({_ECARTS}) - min({_ECARTS})"
+}
+
+def plages_filtres():
+    """
+    Filtres qui sont de simples plages sur une colonne générée :
+    nom => (colonne, borne basse, borne haute) entières, d'après config.py.
+    """
+    return {
+        "somme":    ("somme", SOMME_MIN, SOMME_MAX),
+        "somme3f":  ("somme3f", SOMME3F_MIN, SOMME3F_MAX),
+        "somme3c":  ("somme3c", SOMME3C_MIN, SOMME3C_MAX),
+        "somme3l":  ("somme3l", SOMME3L_MIN, SOMME3L_MAX),
+        "variance": ("variance_num", ceil(25*VARIANCE_MIN), floor(25*VARIANCE_MAX)),
+        "mediane":  ("mediane_ecart2", ceil(2*MEDIAN_MIN), floor(2*MEDIAN_MAX)),
+        "ecart":    ("mediane_ecart2", ceil(2*ECART_MIN), floor(2*ECART_MAX))
+    }
+
+def ensure_colonnes_generees(conn):
+    """
+    Ajoute les colonnes générées (+ un index chacune) à la table des combinaisons.
+    Nécessite SQLite >= 3.31 ; renvoie False si indisponible.
+    """
+    if sqlite3.sqlite_version_info < (3, 31, 0):
+        logger.warning("SQLite < 3.31 : pas de colonnes générées.")
+        return False
+    table= table_physique(conn)
+    cursor= conn.cursor()
+    cursor.execute(f"PRAGMA table_xinfo({table})")
+    existantes= [row[1] for row in cursor.fetchall()]
+    if "boule1" not in existantes:
+        return False
+    for col, expr in COLONNES_GENEREES.items():
+        if col not in existantes:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col} INTEGER GENERATED ALWAYS AS ({expr}) VIRTUAL")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_gen_{col} ON {table}({col})")
+    conn.commit()
+    return True
+
+def colonnes_generees_presentes(conn):
+    cursor= conn.cursor()
+    cursor.execute(f"PRAGMA table_xinfo({table_physique(conn)})")
+    return set(COLONNES_GENEREES) <= {row[1] for row in cursor.fetchall()}
+
+def compter_plage(conn, colonne, borne_min, borne_max):
+    """
+    Nb de combinaisons avec borne_min <= colonne <= borne_max (index idx_gen_*),
+    ex. compter_plage(conn, "somme", 60, 199) pour explorer un seuil.
+    """
+    if colonne not in COLONNES_GENEREES:
+        raise ValueError(f"Colonne générée inconnue : {colonne}")
+    cursor= conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table_physique(conn)} WHERE {colonne} BETWEEN ? AND ?",
+                   (borne_min, borne_max))
+    return cursor.fetchone()[0]
+
+def create_vues_boules_texte(conn):
+    """
+    Vues de compatibilité '<Table>_Texte' : même contenu que la table,
+    plus l'ancienne colonne texte boules = "(b1, b2, b3, b4, b5)".
+    Les tables encore au format texte (non migrées) sont ignorées.
+    """
+    cursor = conn.cursor()
+    for table in TABLES_BOULES:
+        cursor.execute(f"PRAGMA table_info({table})")
+        if "boule1" not in [row[1] for row in cursor.fetchall()]:
+            continue
+        cursor.execute(f"""
+           CREATE VIEW IF NOT EXISTS {table}_Texte AS
+           SELECT *,
+             '(' || boule1 || ', ' || boule2 || ', ' || boule3 || ', '
+                 || boule4 || ', ' || boule5 || ')' AS boules
+           FROM {table}
+        """)
     conn.commit()
-    logger.info("Tables créées ou déjà existantes.")
 
 def ensure_historique_columns(conn):
     cursor = conn.cursor()
@@ -164,6 +595,9 @@ def ensure_historique_columns(conn):
         logger.info("Colonne bitmask ajoutée dans Historique.")
 
 def ensure_combinaisons_filtrees_columns(conn):
+    if mode_stockage(conn)=="bitfield":
+        # la vue expose toujours toutes les colonnes
+        return
     cursor = conn.cursor()
     cursor.execute("PRAGMA table_info(Combinaisons_Filtrees)")
     existing = [row[1] for row in cursor.fetchall()]
@@ -197,6 +631,20 @@ def ensure_combinaisons_filtrees_columns(conn):
         cursor.execute(f"UPDATE Combinaisons_Filtrees SET {col}=0 WHERE {col} IS NULL")
     conn.commit()
 
+def ensure_rang_columns(conn):
+    """
+    Ajoute la colonne 'rang' (identité combinatoire) aux tables
+    créées avant son introduction.
+    """
+    cursor = conn.cursor()
+    for table in ["StatsCombinaisons"] + TABLES_COMBOS_SIMPLES:
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = [row[1] for row in cursor.fetchall()]
+        if "rang" not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN rang INTEGER")
+            conn.commit()
+            logger.info(f"Colonne rang ajoutée dans {table}.")
+
 def fix_null_columns(conn):
     # Au cas où, rien de plus
     pass
@@ -279,6 +727,8 @@ def process_historique_stats(conn):
 
     # liste bitmasks pour MPS
     hist_bitmasks = [r[7] for r in rows]
+    from filters import mps_histogramme
+    hist_freq = mps_histogramme(hist_bitmasks)
 
     data_insert = []
     for idx, r in enumerate(rows):
@@ -287,7 +737,7 @@ def process_historique_stats(conn):
 
         # MPS => un mini-liste
         from filters import filtre_mps
-        res_mps = filtre_mps([me_mask], hist_bitmasks, exclude_self=True)
+        res_mps = filtre_mps([me_mask], hist_bitmasks, exclude_self=True, freq=hist_freq)
         val_mps = res_mps[0]
 
         # calculer les autres
@@ -425,56 +875,120 @@ def write_histo_stats_summary(conn):
 # Génération des combinaisons
 # ---------------------------------------------------------------------
 
-def generate_combinations_in_filtrees(conn):
+def comb_to_bitmask(lst):
+    m=0
+    for x in lst:
+        m |= (1<<(x-1))
+    return m
+
+def generate_combinations_in_filtrees(conn, contraintes=None):
     """
     Génère toutes les combinaisons (5 boules sur 49) dans Combinaisons_Filtrees,
-    stocke bitmask
+    stocke bitmask. L'id de chaque ligne est son rang combinatoire
+    (itertools.combinations suit l'ordre lexicographique de ranking.py).
+    'contraintes' (liste de filtres) => génération élaguée (enumeration.py) :
+    seules les combinaisons qui passent ces filtres sont insérées, avec leurs
+    colonnes filtre_* déjà à 1.
     """
+    if contraintes:
+        generate_combinations_contraintes(conn, contraintes)
+        return
     from math import comb
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM Combinaisons_Filtrees")
+    bitfield= mode_stockage(conn)=="bitfield"
+    if bitfield:
+        table= "Combinaisons_Flags"
+        cols_flags= "filter_flags"
+        nb_zeros= 1
+    else:
+        table= "Combinaisons_Filtrees"
+        cols_flags= """filtre_somme, filtre_dizaines, filtre_suite, filtre_mediane,
+                filtre_variance, filtre_ecart, filtre_ecart_consecutif,
+                filtre_quartileshift_testBorne,
+                filtre_mps, filtre_somme3f, filtre_somme3c,
+                filtre_somme3l, filtre_comparatif, nb_filtres_passes"""
+        nb_zeros= 14
+    sql_insert= f"""
+      INSERT INTO {table}(
+        id, boule1, boule2, boule3, boule4, boule5, bitmask,
+        {cols_flags}
+      ) VALUES ({",".join(["?"]*(7+nb_zeros))})
+    """
+    zeros= (0,)*nb_zeros
     total = comb(49,5)
     print(f"Génération de {total} combinaisons (5 boules sur 49)...")
 
-    def comb_to_bitmask(lst):
-        m=0
-        for x in lst:
-            m |= (1<<(x-1))
-        return m
+    # une seule transaction, index reconstruits à la fin
+    count=0
+    with index_differes(conn, table):
+        cursor.execute(f"DELETE FROM {table}")
+        combos=[]
+        for rang, c5 in enumerate(itertools.combinations(range(1,50),5)):
+            mask= comb_to_bitmask(c5)
+            combos.append((rang, *c5, mask, *zeros))
+            count+=1
+            if count%100000==0:
+                cursor.executemany(sql_insert, combos)
+                combos=[]
+                print(f"{count} combos insérées.")
+        if combos:
+            cursor.executemany(sql_insert, combos)
+        conn.commit()
+    # univers complet => bitmaps de filtres remis à zéro
+    reinitialiser_bitmaps(conn, bitmap_plein())
+    print(f"{count} combinaisons insérées dans Combinaisons_Filtrees.")
+    if UNIVERS_BINAIRE and not univers_valide():
+        print(f"Univers binaire écrit : {ecrire_univers()}")
 
+def generate_combinations_contraintes(conn, contraintes):
+    """
+    Parcourt l'arbre des combinaisons en coupant les branches dont le préfixe
+    viole un des filtres imposés, et n'insère que les combinaisons retenues
+    (mêmes ids / rangs, même résultat que générer puis appliquer ces filtres).
+    """
+    contraintes= [f for f in ORDRE_FILTRES if f in contraintes]
+    cursor= conn.cursor()
+    bitfield= mode_stockage(conn)=="bitfield"
+    drapeaux= [1 if f in contraintes else 0 for f in ORDRE_FILTRES]
+    if bitfield:
+        table= "Combinaisons_Flags"
+        cols_flags= ["filter_flags"]
+        valeurs= [sum(d << i for i, d in enumerate(drapeaux))]
+    else:
+        table= "Combinaisons_Filtrees"
+        cols_flags= [f"filtre_{f}" for f in ORDRE_FILTRES] + ["nb_filtres_passes"]
+        valeurs= drapeaux + [len(contraintes)]
+    sql_insert= f"""
+      INSERT INTO {table}(id, {COLS_BOULES}, bitmask, {", ".join(cols_flags)})
+      VALUES ({",".join(["?"]*(7+len(cols_flags)))})
+    """
+    print(f"Génération élaguée, filtres imposés : {', '.join(contraintes)}")
+
+    stats= {}
+    rangs_tous= []
     count=0
-    combos=[]
-    for c5 in itertools.combinations(range(1,50),5):
-        mask= comb_to_bitmask(c5)
-        combos.append((str(c5), mask, 0,0,0,0,0,0,0,0,0,0,0,0,0,0))
-        count+=1
-        if count%100000==0:
-            cursor.executemany("""
-              INSERT INTO Combinaisons_Filtrees(
-                boules, bitmask,
-                filtre_somme, filtre_dizaines, filtre_suite, filtre_mediane,
-                filtre_variance, filtre_ecart, filtre_ecart_consecutif,
-                filtre_quartileshift_testBorne,
-                filtre_mps, filtre_somme3f, filtre_somme3c,
-                filtre_somme3l, filtre_comparatif, nb_filtres_passes
-              ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-            """, combos)
-            conn.commit()
-            combos=[]
+    with index_differes(conn, table):
+        cursor.execute(f"DELETE FROM {table}")
+        for rangs, arr in enumerer_combinaisons(contraintes, stats=stats):
+            masks= lot_rangs(rangs)[1]
+            fixes= np.tile(np.array(valeurs, dtype=np.int64), (len(rangs), 1))
+            cursor.executemany(sql_insert,
+                np.column_stack([rangs, arr, masks.astype(np.int64), fixes]).tolist())
+            rangs_tous.append(rangs)
+            count+= len(rangs)
             print(f"{count} combos insérées.")
-    if combos:
-        cursor.executemany("""
-          INSERT INTO Combinaisons_Filtrees(
-            boules, bitmask,
-            filtre_somme, filtre_dizaines, filtre_suite, filtre_mediane,
-            filtre_variance, filtre_ecart, filtre_ecart_consecutif,
-            filtre_quartileshift_testBorne,
-            filtre_mps, filtre_somme3f, filtre_somme3c,
-            filtre_somme3l, filtre_comparatif, nb_filtres_passes
-          ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-        """, combos)
         conn.commit()
-    print(f"{count} combinaisons insérées dans Combinaisons_Filtrees.")
+    rangs_tous= np.concatenate(rangs_tous) if rangs_tous else np.zeros(0, dtype=np.int64)
+    # présence = combinaisons retenues ; les filtres imposés valent 1 partout
+    reinitialiser_bitmaps(conn, bitmap_depuis_rangs(rangs_tous))
+    for nom in contraintes:
+        maj_bitmap_filtre(conn, nom, rangs_tous, np.ones(len(rangs_tous), dtype=np.uint8))
+    total= comb(49,5)
+    print(f"{count} combinaisons insérées dans Combinaisons_Filtrees "
+          f"({(count/total)*100:.2f}% de {total}) : {stats['noeuds']} préfixes visités, "
+          f"{stats['coupes']} branches coupées, {stats['feuilles']} feuilles vérifiées.")
+    if UNIVERS_BINAIRE and not univers_valide():
+        print(f"Univers binaire écrit : {ecrire_univers()}")
 
 # ---------------------------------------------------------------------
 # Application interactive des filtres => mps chunk python, comparatif
@@ -488,10 +1002,19 @@ def apply_filter(conn, filter_name, filter_func, historique):
     - si 'quartileshift_testBorne', on applique la pondération 1.0/0.4/0.0
       + coverage 95 => 1 ou 0
     - sinon => "filtres rapides"
+    Les filtres présents dans FILTRES_BATCH sont évalués en une passe
+    vectorisée sur le tableau (N,5) des boules.
+    Avec CACHE_FILTRES, le résultat vient du cache persistant (apply_filter_cache).
+    Si l'univers binaire existe (univers.py), boules et bitmask sont lus
+    dans le memmap par id au lieu de transiter par SQLite.
     """
     cursor= conn.cursor()
     col = f"filtre_{filter_name}"
 
+    if CACHE_FILTRES and filter_name in ORDRE_FILTRES:
+        apply_filter_cache(conn, filter_name, historique)
+        return
+
     if filter_name=="mps":
         compute_mps_in_python(conn, historique)
         # résumé
@@ -503,162 +1026,378 @@ def apply_filter(conn, filter_name, filter_func, historique):
         print(f"Filtre 'mps' appliqué => {acc} ({ratio:.2f}%)")
         return
 
-    elif filter_name=="comparatif":
-        from filters import filtre_comparatif
+    univers= ouvrir_univers() if UNIVERS_BINAIRE else None
+    colonnes= [f"IFNULL({col},0)", "IFNULL(nb_filtres_passes,0)"]
+    if filter_name=="comparatif":
         last10_bitmasks= historique[-10:] if len(historique)>=10 else []
-        cursor.execute(f"SELECT id, bitmask, {col}, nb_filtres_passes FROM Combinaisons_Filtrees")
-        rows= cursor.fetchall()
-        tot= len(rows)
-        accepted=0
-        updates=[]
-        for (cid, c_mask, old_val, old_nb) in rows:
-            old_val= old_val or 0
-            old_nb = old_nb or 0
-            val= filtre_comparatif(c_mask, last10_bitmasks, threshold=3)
-            new_nb= old_nb - old_val + val
-            updates.append((val,new_nb,cid))
-            if val==1:
-                accepted+=1
-        cursor.executemany(f"""
-          UPDATE Combinaisons_Filtrees
-          SET {col}=?, nb_filtres_passes=?
-          WHERE id=?
-        """, updates)
-        conn.commit()
-        ratio= (accepted/tot)*100 if tot else 0
-        print(f"Filtre 'comparatif' => {accepted} ({ratio:.2f}%) sur {tot}")
-        return
-
-    elif filter_name=="quartileshift_testborne":
-        from filters import filtre_quartileshift_testBorne
-        cursor.execute(f"SELECT id,boules,{col},nb_filtres_passes FROM Combinaisons_Filtrees")
-        rows= cursor.fetchall()
-        tot= len(rows)
-        accepted=0
-        updates=[]
-        for (cid,bstr,old_val,old_nb) in rows:
-            old_val= old_val or 0
-            old_nb= old_nb or 0
-            comb= eval(bstr)
-            val= filtre_quartileshift_testBorne(comb)
-            new_nb= old_nb - old_val + val
-            updates.append((val,new_nb,cid))
-            if val==1:
-                accepted+=1
-        cursor.executemany(f"""
-          UPDATE Combinaisons_Filtrees
-          SET {col}=?, nb_filtres_passes=?
-          WHERE id=?
-        """, updates)
-        conn.commit()
-        ratio= (accepted/tot)*100 if tot else 0
-        print(f"Filtre 'quartileshift_testborne' => {accepted} ({ratio:.2f}%) sur {tot}")
-        return
+        if univers is None:
+            colonnes.append("bitmask")
+    elif univers is None:
+        colonnes.append(COLS_BOULES)
+    batch_func= FILTRES_BATCH.get(filter_name)
+
+    tot=0
+    accepted=0
+    for rows in iter_chunks(conn, "Combinaisons_Filtrees", colonnes):
+        ids, old_val, old_nb= rows[:,0], rows[:,1], rows[:,2]
+        if filter_name=="comparatif":
+            masks= univers[1][ids] if univers is not None else rows[:,3].astype(np.uint64)
+            vals= filtre_comparatif_batch(masks, last10_bitmasks, threshold=3)
+        else:
+            arr= univers[0][ids] if univers is not None else rows[:,3:8].astype(np.uint8)
+            if batch_func is not None:
+                vals= batch_func(arr)
+            else:
+                vals= np.array([filter_func(tuple(c)) for c in arr.tolist()], dtype=np.uint8)
+        tot+= len(rows)
+        accepted+= _ecrire_resultat_filtre(conn, col, ids, old_val, old_nb, vals)
+    ratio= (accepted/tot)*100 if tot else 0
+    print(f"Filtre '{filter_name}' => {accepted} ({ratio:.2f}%) sur {tot}")
 
+def apply_filter_sql(conn, filter_name, historique):
+    """
+    Applique 'filter_name' en un seul UPDATE exécuté par SQLite avec la fonction
+    filtre_<nom> enregistrée sur la connexion (ou une plage sur une colonne générée).
+    Le bitmap du filtre est ensuite reconstruit à partir des seuls ids qui passent
+    (SELECT id ... WHERE filtre = 1) : les lignes rejetées ne transitent pas par python.
+    """
+    nom= filter_name.lower()
+    col= f"filtre_{nom}"
+    plages= plages_filtres()
+    if nom in plages and colonnes_generees_presentes(conn):
+        # simple plage sur une colonne générée : aucun appel python
+        colonne, lo, hi= plages[nom]
+        expr= f"({colonne} BETWEEN {lo} AND {hi})"
+    elif nom in ("mps", "comparatif"):
+        enregistrer_fonctions_historique(conn, historique)
+        expr= f"{col}(bitmask)"
     else:
-        # filtres "rapides"
-        cursor.execute(f"SELECT id,boules,{col},nb_filtres_passes FROM Combinaisons_Filtrees")
-        rows= cursor.fetchall()
-        tot= len(rows)
-        accepted=0
-        updates=[]
-        for (cid,bstr,old_val,old_nb) in rows:
-            old_val= old_val or 0
-            old_nb= old_nb or 0
-            comb= eval(bstr)
-            val= filter_func(comb)
-            new_nb= old_nb - old_val + val
-            updates.append((val,new_nb,cid))
-            if val==1:
-                accepted+=1
-        cursor.executemany(f"""
-          UPDATE Combinaisons_Filtrees
-          SET {col}=?, nb_filtres_passes=?
-          WHERE id=?
-        """, updates)
+        expr= f"{col}({COLS_BOULES})"
+    cursor= conn.cursor()
+    if mode_stockage(conn)=="bitfield":
+        bit= 1 << ORDRE_FILTRES.index(nom)
+        cursor.execute(f"""
+          UPDATE Combinaisons_Flags
+          SET filter_flags = (filter_flags & ~{bit}) | ({expr} * {bit})
+        """)
+        table, condition= "Combinaisons_Flags", f"filter_flags & {bit}"
+    else:
+        cursor.execute(f"UPDATE Combinaisons_Filtrees SET {col} = {expr}")
+        recalculer_nb_filtres(conn)
+        table, condition= "Combinaisons_Filtrees", f"{col} = 1"
+    conn.commit()
+
+    passes= np.array([r[0] for r in cursor.execute(f"SELECT id FROM {table} WHERE {condition}")],
+                     dtype=np.int64)
+    remplacer_bitmap_filtre(conn, nom, passes)
+    tot= cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    accepted= len(passes)
+    ratio= (accepted/tot)*100 if tot else 0
+    print(f"Filtre '{filter_name}' (SQL) => {accepted} ({ratio:.2f}%) sur {tot}")
+
+def apply_filter_cache(conn, filter_name, historique):
+    """
+    Applique 'filter_name' à partir de son résultat sur l'univers
+    (cache_filtres : lu en cache si les seuils n'ont pas changé, sinon calculé une fois).
+    """
+    col= f"filtre_{filter_name}"
+    bm, en_cache= resultat_filtre(filter_name, historique)
+    vect= bitmap_vers_bool(bm)
+    tot=0
+    accepted=0
+    for rows in iter_chunks(conn, "Combinaisons_Filtrees",
+                            [f"IFNULL({col},0)", "IFNULL(nb_filtres_passes,0)"]):
+        ids, old_val, old_nb= rows[:,0], rows[:,1], rows[:,2]
+        tot+= len(rows)
+        accepted+= _ecrire_resultat_filtre(conn, col, ids, old_val, old_nb, vect[ids])
+    ratio= (accepted/tot)*100 if tot else 0
+    origine= "cache" if en_cache else "calculé"
+    print(f"Filtre '{filter_name}' ({origine}) => {accepted} ({ratio:.2f}%) sur {tot}")
+
+def _ecrire_resultat_filtre(conn, col, ids, old_val, old_nb, vals):
+    """
+    Met à jour la colonne du filtre (vals = vecteur 0/1) et nb_filtres_passes
+    à partir des anciennes valeurs, renvoie le nb d'acceptées.
+    Seules les lignes dont la valeur change sont écrites.
+    """
+    if len(ids)==0:
+        return 0
+    vals= np.asarray(vals, dtype=np.int64)
+    old_val= np.asarray(old_val, dtype=np.int64)
+    ids= np.asarray(ids, dtype=np.int64)
+    maj_bitmap_filtre(conn, col[len("filtre_"):].lower(), ids, vals)
+    chg= vals!=old_val
+    if mode_stockage(conn)=="bitfield":
+        # nb_filtres_passes est dérivé (popcount) => on ne touche qu'au bit du filtre
+        bit= 1 << ORDRE_FILTRES.index(col[len("filtre_"):].lower())
+        maj_par_lot(conn, "Combinaisons_Flags", ["val"], ids[chg], vals[chg],
+                    {"filter_flags": f"(filter_flags & ~{bit}) | (lot.val * {bit})"})
         conn.commit()
-        ratio= (accepted/tot)*100 if tot else 0
-        print(f"Filtre '{filter_name}' => {accepted} ({ratio:.2f}%) sur {tot}")
+        return int(vals.sum())
+    new_nb= np.asarray(old_nb, dtype=np.int64) - old_val + vals
+    maj_par_lot(conn, "Combinaisons_Filtrees", ["val", "nb"], ids[chg],
+                np.column_stack([vals, new_nb])[chg],
+                {col: "lot.val", "nb_filtres_passes": "lot.nb"})
+    conn.commit()
+    return int(vals.sum())
 
 def compute_mps_in_python(conn, historique, chunk_size=None):
     """
     Lit Combinaisons_Filtrees en chunk, calcule MPS en python, 
     update filtre_mps => 0/1, recalc nb_filtres_passes
     """
-    from filters import filtre_mps
+    from filters import filtre_mps, mps_histogramme
     if chunk_size is None:
         from config import CHUNK_SIZE_MPS
         chunk_size= CHUNK_SIZE_MPS
 
     cursor= conn.cursor()
     hist_bitmasks= [bm for bm in historique]
+    # histogramme des 49 boules, calculé une seule fois
+    freq= mps_histogramme(hist_bitmasks)
     cursor.execute("SELECT COUNT(*) FROM Combinaisons_Filtrees")
     total= cursor.fetchone()[0]
     if total==0:
         print("Aucune combinaison.")
         return
 
-    print(f"Calcul MPS (chunk python) sur {total} combos, hist={len(hist_bitmasks)}.")
-    offset=0
+    bitfield= mode_stockage(conn)=="bitfield"
+    bit_mps= 1 << ORDRE_FILTRES.index("mps")
+    # bitmasks lus dans l'univers binaire (par id) s'il existe
+    univers= ouvrir_univers() if UNIVERS_BINAIRE else None
+    colonnes= ["IFNULL(filtre_mps,0)"] if univers is not None else ["bitmask", "IFNULL(filtre_mps,0)"]
+    print(f"Calcul MPS (histogramme) sur {total} combos, hist={len(hist_bitmasks)}.")
     processed=0
     accepted_global=0
     chunk_idx=0
 
-    while True:
-        cursor.execute("""
-          SELECT id, bitmask, filtre_mps, nb_filtres_passes
-          FROM Combinaisons_Filtrees
-          ORDER BY id
-          LIMIT ? OFFSET ?
-        """,(chunk_size, offset))
-        rows= cursor.fetchall()
-        if not rows:
-            break
-        offset+= len(rows)
+    for rows in iter_chunks(conn, "Combinaisons_Filtrees", colonnes, chunk_size):
         chunk_idx+=1
-        combos_chunk= [r[1] for r in rows]
-        ids_chunk= [r[0] for r in rows]
-
-        results= filtre_mps(combos_chunk, hist_bitmasks, exclude_self=False)
-        ups=[]
-        for i,res_mps in enumerate(results):
-            cid= ids_chunk[i]
-            ups.append((res_mps, cid))
-            if res_mps==1:
-                accepted_global+=1
-
-        cursor.executemany("""
-          UPDATE Combinaisons_Filtrees
-          SET filtre_mps=?
-          WHERE id=?
-        """, ups)
+        ids_chunk= rows[:,0]
+        if univers is not None:
+            combos_chunk= univers[1][ids_chunk]
+            old_chunk= rows[:,1]
+        else:
+            combos_chunk= rows[:,1].tolist()
+            old_chunk= rows[:,2]
+
+        results= filtre_mps(combos_chunk, hist_bitmasks, exclude_self=False, freq=freq)
+        maj_bitmap_filtre(conn, "mps", ids_chunk, results)
+        results= np.asarray(results, dtype=np.int64)
+        accepted_global+= int(results.sum())
+        chg= results!=old_chunk
+
+        if bitfield:
+            maj_par_lot(conn, "Combinaisons_Flags", ["val"], ids_chunk[chg], results[chg],
+                        {"filter_flags": f"(filter_flags & ~{bit_mps}) | (lot.val * {bit_mps})"})
+        else:
+            maj_par_lot(conn, "Combinaisons_Filtrees", ["val"], ids_chunk[chg], results[chg],
+                        {"filtre_mps": "lot.val"})
         conn.commit()
 
         processed+= len(rows)
         print(f"Chunk {chunk_idx}: {len(rows)} combos => MPS calculé, total={processed}/{total}")
-        if len(rows)<chunk_size:
-            break
 
-    # recalc nb_filtres_passes
-    cursor.execute("""
-      UPDATE Combinaisons_Filtrees
-      SET nb_filtres_passes = (
-         filtre_somme + filtre_dizaines + filtre_suite + filtre_mediane +
-         filtre_variance + filtre_ecart + filtre_ecart_consecutif +
-         filtre_quartileshift_testborne + filtre_mps +
-         filtre_somme3f + filtre_somme3c + filtre_somme3l + filtre_comparatif
-      )
-    """)
+    # recalc nb_filtres_passes (en mode bitfield, c'est le popcount de la vue)
+    recalculer_nb_filtres(conn)
     conn.commit()
 
     ratio_final= (accepted_global/ processed)*100 if processed else 0
     print(f"Filtre MPS terminé => {accepted_global} ({ratio_final:.2f}%).")
 
+def apply_filters_fused(conn, selection, historique):
+    """
+    Mode fusionné : une seule lecture de Combinaisons_Filtrees (par pages,
+    iter_chunks), évaluation de tous les filtres de 'selection' sur chaque page,
+    puis une seule écriture de toutes les colonnes filtre_* et de nb_filtres_passes.
+    Les filtres non sélectionnés gardent leur valeur actuelle.
+    """
+    selection= [f for f in ORDRE_FILTRES if f in selection]
+    if not selection:
+        print("Aucun filtre sélectionné.")
+        return
+    freq= mps_histogramme(historique) if "mps" in selection else None
+    bitfield= mode_stockage(conn)=="bitfield"
+    resultats= None
+    if CACHE_FILTRES:
+        # résultats sur l'univers (cache_filtres), indexés par rang = id
+        resultats= {}
+        for nom in selection:
+            bm, en_cache= resultat_filtre(nom, historique)
+            resultats[nom]= bitmap_vers_bool(bm)
+            if en_cache:
+                print(f"Filtre '{nom}' : résultat lu en cache.")
+
+    univers= ouvrir_univers() if UNIVERS_BINAIRE else None
+    print(f"Mode fusionné : {len(selection)} filtres (une lecture, une écriture par page).")
+    tot=0
+    acceptes= dict.fromkeys(selection, 0)
+    for rows in iter_chunks(conn, "Combinaisons_Filtrees", _colonnes_flags(univers)):
+        ids, flags, chg= _evaluer_flags(rows, selection, historique, freq, resultats, univers)
+        _ecrire_flags(conn, bitfield, selection, ids, flags, chg)
+        for nom in selection:
+            acceptes[nom]+= int(flags[:,ORDRE_FILTRES.index(nom)].sum())
+        tot+= len(rows)
+    _resume_flags(selection, acceptes, tot)
+
+# colonnes lues par le mode fusionné / parallèle : boules, bitmask, 13 drapeaux
+_COLONNES_DRAPEAUX= [f"IFNULL(filtre_{f},0)" for f in ORDRE_FILTRES]
+_COLONNES_FLAGS= [COLS_BOULES, "bitmask"] + _COLONNES_DRAPEAUX
+
+def _colonnes_flags(univers):
+    # avec l'univers binaire, seuls les drapeaux sont lus dans SQLite
+    return _COLONNES_DRAPEAUX if univers is not None else _COLONNES_FLAGS
+
+def _evaluer_flags(rows, selection, historique, freq, resultats=None, univers=None):
+    """
+    rows = page (id, boules, bitmask, 13 drapeaux) => (ids, drapeaux recalculés,
+    masque des lignes dont au moins un filtre change).
+    'resultats' : {filtre: vecteur booléen sur l'univers} déjà connus (cache).
+    'univers' : (boules, bitmasks) de univers.py, rows = (id, 13 drapeaux).
+    """
+    ids= rows[:,0]
+    if univers is not None:
+        arr, masks= univers[0][ids], univers[1][ids]
+    else:
+        arr= rows[:,1:6].astype(np.uint8)
+        masks= rows[:,6].astype(np.uint64)
+    flags= rows[:,-len(ORDRE_FILTRES):].copy()
+    for nom in selection:
+        j= ORDRE_FILTRES.index(nom)
+        if resultats is not None and nom in resultats:
+            flags[:,j]= resultats[nom][ids]
+        else:
+            flags[:,j]= evaluer_filtre_batch(nom, arr, masks, historique, freq=freq)
+    return ids, flags, (flags!=rows[:,-len(ORDRE_FILTRES):]).any(axis=1)
+
+def _ecrire_flags(conn, bitfield, selection, ids, flags, chg):
+    """
+    Écrit une page de drapeaux (seules les lignes modifiées) et les bitmaps.
+    """
+    for nom in selection:
+        maj_bitmap_filtre(conn, nom, ids, flags[:,ORDRE_FILTRES.index(nom)])
+    if bitfield:
+        packed= (flags << np.arange(len(ORDRE_FILTRES), dtype=np.int64)).sum(axis=1)
+        maj_par_lot(conn, "Combinaisons_Flags", ["filter_flags"], ids[chg], packed[chg])
+    else:
+        idx_sel= [ORDRE_FILTRES.index(f) for f in selection]
+        cols= [f"filtre_{f}" for f in selection] + ["nb_filtres_passes"]
+        maj_par_lot(conn, "Combinaisons_Filtrees", cols, ids[chg],
+                    np.column_stack([flags[:,idx_sel], flags.sum(axis=1)])[chg])
+    conn.commit()
+
+def _resume_flags(selection, acceptes, tot):
+    if tot==0:
+        print("Aucune combinaison.")
+        return
+    for nom in selection:
+        acc= acceptes[nom]
+        print(f"Filtre '{nom}' => {acc} ({(acc/tot)*100:.2f}%) sur {tot}")
+
+def fichier_base(conn):
+    """
+    Chemin du fichier de la base principale de 'conn' (None pour une base en mémoire).
+    """
+    for _, nom, fichier in conn.execute("PRAGMA database_list").fetchall():
+        if nom == "main":
+            return fichier or None
+    return None
+
+def _evaluer_shard(args):
+    """
+    Tâche d'un processus : lit la tranche d'ids [id_min, id_max) sur sa propre
+    connexion (lecture seule) et renvoie (ids, drapeaux, masque des changements).
+    """
+    db_file, id_min, id_max, selection, historique, freq, en_cache= args
+    # chaque processus ouvre le même fichier univers (pages partagées par l'OS)
+    univers= ouvrir_univers() if UNIVERS_BINAIRE else None
+    # filtres déjà en cache : relus par le processus (bitmaps de ~238 Ko)
+    resultats= {}
+    for nom in en_cache:
+        bm= charger_resultat(nom, historique)
+        if bm is not None:
+            resultats[nom]= bitmap_vers_bool(bm)
+    colonnes= _colonnes_flags(univers)
+    conn= create_connection(db_file, profil="read")
+    try:
+        rows= conn.execute(f"""
+          SELECT id, {", ".join(colonnes)} FROM Combinaisons_Filtrees
+          WHERE id >= ? AND id < ? ORDER BY id
+        """, (id_min, id_max)).fetchall()
+    finally:
+        conn.close()
+    rows= np.array(rows, dtype=np.int64).reshape(-1, 1+len(ORDRE_FILTRES)+(0 if univers is not None else 6))
+    ids, flags, chg= _evaluer_flags(rows, selection, historique, freq, resultats, univers)
+    return ids, flags.astype(np.uint8), chg
+
+def apply_filters_parallele(conn, selection, historique, nb_workers=None):
+    """
+    Comme apply_filters_fused, mais l'univers est découpé en tranches d'ids
+    évaluées par un pool de processus (NB_WORKERS). Le processus principal reste
+    le seul à écrire, tranche par tranche dans l'ordre des ids : résultat identique
+    à l'évaluation série.
+    Avec CACHE_FILTRES, les filtres déjà en cache sont relus par chaque processus,
+    les autres sont évalués par tranche ; si la table couvre tout l'univers, leurs
+    résultats sont ensuite mis en cache.
+    """
+    if nb_workers is None:
+        nb_workers= NB_WORKERS
+    db_file= fichier_base(conn)
+    if nb_workers<=1 or db_file is None:
+        apply_filters_fused(conn, selection, historique)
+        return
+    selection= [f for f in ORDRE_FILTRES if f in selection]
+    if not selection:
+        print("Aucun filtre sélectionné.")
+        return
+    freq= mps_histogramme(historique) if "mps" in selection else None
+    bitfield= mode_stockage(conn)=="bitfield"
+    id_min, id_max= conn.execute("SELECT MIN(id), MAX(id) FROM Combinaisons_Filtrees").fetchone()
+    if id_min is None:
+        print("Aucune combinaison.")
+        return
+    conn.commit()   # les lecteurs doivent voir l'état courant
+    en_cache= [nom for nom in selection if CACHE_FILTRES and charger_resultat(nom, historique) is not None]
+    a_calculer= {nom: np.zeros(NB_COMBINAISONS, dtype=bool)
+                 for nom in selection if CACHE_FILTRES and nom not in en_cache}
+    for nom in en_cache:
+        print(f"Filtre '{nom}' : résultat lu en cache.")
+
+    # ~4 tranches par processus pour équilibrer, bornées par CHUNK_SIZE_SCAN
+    nb_tranches= max(nb_workers*4, ceil((id_max-id_min+1)/CHUNK_SIZE_SCAN))
+    bornes= np.linspace(id_min, id_max+1, nb_tranches+1).astype(np.int64)
+    taches= [(db_file, int(bornes[i]), int(bornes[i+1]), selection, historique, freq, en_cache)
+             for i in range(nb_tranches) if bornes[i]<bornes[i+1]]
+    print(f"Mode parallèle : {len(selection)} filtres, {len(taches)} tranches sur {nb_workers} processus.")
+
+    tot=0
+    acceptes= dict.fromkeys(selection, 0)
+    with ProcessPoolExecutor(max_workers=nb_workers) as pool:
+        for ids, flags, chg in pool.map(_evaluer_shard, taches):
+            flags= flags.astype(np.int64)
+            _ecrire_flags(conn, bitfield, selection, ids, flags, chg)
+            for nom in selection:
+                acceptes[nom]+= int(flags[:,ORDRE_FILTRES.index(nom)].sum())
+            for nom, vect in a_calculer.items():
+                vect[ids]= flags[:,ORDRE_FILTRES.index(nom)]
+            tot+= len(ids)
+    if tot==NB_COMBINAISONS:
+        # ids = rangs, tout l'univers évalué => résultats réutilisables
+        for nom, vect in a_calculer.items():
+            sauver_resultat(nom, historique, bitmap_depuis_bool(vect))
+    _resume_flags(selection, acceptes, tot)
+    logger.info(f"Mode fusionné : {len(selection)} filtres appliqués en une passe.")
+
 def apply_all_filters_interactive(conn, historique):
     """
     Propose 13 filtres: somme, dizaines, suite, mediane, variance,
     ecart, ecart_consecutif, quartileshift_testborne, mps,
     somme3f, somme3c, somme3l, comparatif
+    En mode fusionné, la sélection est faite d'abord puis appliquée
+    en une seule passe (apply_filters_fused), répartie sur un pool de processus
+    si NB_WORKERS > 1 (apply_filters_parallele, un seul pool pour toute la sélection).
+    Filtre par filtre, l'évaluation reste série ; avec FILTRES_EN_SQL, chaque
+    filtre est un UPDATE exécuté par SQLite (apply_filter_sql).
     """
     from filters import (
         filtre_somme, filtre_dizaines, filtre_suite, filtre_mediane,
@@ -681,17 +1420,26 @@ def apply_all_filters_interactive(conn, historique):
         "somme3l": filtre_somme3l,
         "comparatif": filtre_comparatif
     }
-    order= [
-      "somme","dizaines","suite","mediane","variance",
-      "ecart","ecart_consecutif","quartileshift_testborne","mps",
-      "somme3f","somme3c","somme3l","comparatif"
-    ]
-    for key in order:
-        rep= input(f"Appliquer le filtre '{key}' ? (y/n) : ").lower().strip()
-        if rep=="y":
-            apply_filter(conn, key, filters_list[key], historique)
-        else:
-            print(f"Filtre '{key}' ignoré.")
+    order= ORDRE_FILTRES
+    table= table_physique(conn)
+    fused= input("Mode fusionné (sélection puis une seule passe) ? (y/n) : ").lower().strip()=="y"
+    if fused:
+        selection= [key for key in order
+                    if input(f"Appliquer le filtre '{key}' ? (y/n) : ").lower().strip()=="y"]
+        with index_differes(conn, table, prefixe="idx_combinaisons_nb"):
+            apply_filters_parallele(conn, selection, historique)
+        return
+    # index (nb_filtres_passes) reconstruit une fois après tous les filtres ;
+    # les index des colonnes générées ne dépendent que des boules => conservés
+    with index_differes(conn, table, prefixe="idx_combinaisons_nb"):
+        for key in order:
+            rep= input(f"Appliquer le filtre '{key}' ? (y/n) : ").lower().strip()
+            if rep=="y" and FILTRES_EN_SQL:
+                apply_filter_sql(conn, key, historique)
+            elif rep=="y":
+                apply_filter(conn, key, filters_list[key], historique)
+            else:
+                print(f"Filtre '{key}' ignoré.")
 
 # ---------------------------------------------------------------------
 # StatsCombinaisons, extraction, heuristiques
@@ -703,30 +1451,29 @@ def process_combinaisons_stats(conn):
     """
     cursor=conn.cursor()
     cursor.execute("DELETE FROM StatsCombinaisons")
+    # copie entièrement côté SQLite (aucune ligne ne transite par python)
     cursor.execute("""
-      SELECT
-        boules,
+      INSERT INTO StatsCombinaisons(
+        rang, boule1, boule2, boule3, boule4, boule5, bitmask,
         filtre_somme, filtre_dizaines, filtre_suite, filtre_mediane,
         filtre_variance, filtre_ecart, filtre_ecart_consecutif,
         filtre_quartileshift_testborne,
         filtre_mps, filtre_somme3f, filtre_somme3c, filtre_somme3l,
         filtre_comparatif, nb_filtres_passes
-      FROM Combinaisons_Filtrees
-    """)
-    rows= cursor.fetchall()
-    data= [r for r in rows]
-    cursor.executemany("""
-      INSERT INTO StatsCombinaisons(
-        boules,
+      )
+      SELECT
+        id, boule1, boule2, boule3, boule4, boule5, bitmask,
         filtre_somme, filtre_dizaines, filtre_suite, filtre_mediane,
         filtre_variance, filtre_ecart, filtre_ecart_consecutif,
         filtre_quartileshift_testborne,
         filtre_mps, filtre_somme3f, filtre_somme3c, filtre_somme3l,
         filtre_comparatif, nb_filtres_passes
-      ) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-    """, data)
+      FROM Combinaisons_Filtrees
+      ORDER BY id
+    """)
+    nb= cursor.rowcount
     conn.commit()
-    logger.info(f"{len(data)} stats dans StatsCombinaisons.")
+    logger.info(f"{nb} stats dans StatsCombinaisons.")
 
 def write_combos_stats_summary(conn):
     """
@@ -803,15 +1550,35 @@ def extraction_seuil(conn):
     except:
         print("Extraction annulée.")
         return None
+    if input("Évaluer directement les filtres (ordre coût/sélectivité, arrêt anticipé) ? (y/n) : ").lower().strip()=="y":
+        return extraction_court_circuit(conn, thr)
     cursor= conn.cursor()
+    res_bitmaps= rangs_au_moins_k(conn, thr)
+    if res_bitmaps is not None:
+        # bitmaps disponibles => aucune lecture de Combinaisons_Filtrees
+        rangs, tot= res_bitmaps
+        _ecrire_extraites(conn, rangs)
+        cpt= len(rangs)
+        ratio= (cpt/tot)*100 if tot else 0
+        print(f"Extraction (bitmaps) => {cpt} combos ({ratio:.2f}%) vers CombinaisonsExtraites.")
+        return "CombinaisonsExtraites"
     cursor.execute("SELECT COUNT(*) FROM Combinaisons_Filtrees")
     tot= cursor.fetchone()[0]
     cursor.execute("DELETE FROM CombinaisonsExtraites")
-    cursor.execute("""
-      INSERT INTO CombinaisonsExtraites(boules)
-      SELECT boules FROM Combinaisons_Filtrees
-      WHERE nb_filtres_passes >= ?
-    """,(thr,))
+    if mode_stockage(conn)=="bitfield" and thr>=len(ORDRE_FILTRES):
+        # tous les filtres => simple test de bits sur filter_flags
+        tous= (1 << len(ORDRE_FILTRES)) - 1
+        cursor.execute(f"""
+          INSERT INTO CombinaisonsExtraites(rang, boule1, boule2, boule3, boule4, boule5, bitmask)
+          SELECT id, boule1, boule2, boule3, boule4, boule5, bitmask FROM Combinaisons_Flags
+          WHERE filter_flags & {tous} = {tous}
+        """)
+    else:
+        cursor.execute("""
+          INSERT INTO CombinaisonsExtraites(rang, boule1, boule2, boule3, boule4, boule5, bitmask)
+          SELECT id, boule1, boule2, boule3, boule4, boule5, bitmask FROM Combinaisons_Filtrees
+          WHERE nb_filtres_passes >= ?
+        """,(thr,))
     conn.commit()
     cursor.execute("SELECT COUNT(*) FROM CombinaisonsExtraites")
     cpt= cursor.fetchone()[0]
@@ -819,48 +1586,288 @@ def extraction_seuil(conn):
     print(f"Extraction => {cpt} combos ({ratio:.2f}%) vers CombinaisonsExtraites.")
     return "CombinaisonsExtraites"
 
-def apply_heuristique_4sur5(conn, table_name="CombinaisonsExtraites"):
+def _ecrire_extraites(conn, rangs):
     """
-    Applique la fonction heuristic_4sur5 => coverage
+    Remplace le contenu de CombinaisonsExtraites par les combinaisons de ces rangs.
     """
+    arr, masks= lot_rangs(rangs)
     cursor= conn.cursor()
-    cursor.execute(f"SELECT boules FROM {table_name}")
-    rows= cursor.fetchall()
-    combos= [eval(r[0]) for r in rows]
-    print(f"Itération 1, combos restant={len(combos)}")
-    coverage= heuristic_4sur5(combos)
-    ratio= (len(coverage)/ len(combos))*100 if combos else 0
-    cursor.execute("DELETE FROM Heuristique4sur5")
-    data= [(str(c),) for c in coverage]
-    cursor.executemany("INSERT INTO Heuristique4sur5(boules) VALUES(?)", data)
+    cursor.execute("DELETE FROM CombinaisonsExtraites")
+    cursor.executemany(f"""
+      INSERT INTO CombinaisonsExtraites(rang, {COLS_BOULES}, bitmask)
+      VALUES(?,?,?,?,?,?,?)
+    """, np.column_stack([rangs, arr, masks.astype(np.int64)]).tolist())
     conn.commit()
-    print(f"Heuristique4sur5 => {len(coverage)} combos ({ratio:.2f}%).")
 
-def apply_heuristique_3sur5(conn, table_name="Heuristique4sur5"):
+def extraction_court_circuit(conn, thr):
+    """
+    Extraction "au moins thr filtres" sans lire les colonnes de filtres :
+    les 13 filtres de filters.py sont réévalués sur les combinaisons présentes,
+    ordonnés par coût / sélectivité mesurés, et chaque combinaison cesse d'être
+    évaluée dès que le seuil est atteint ou devenu inatteignable (extraction.py).
+    """
     cursor= conn.cursor()
-    cursor.execute(f"SELECT boules FROM {table_name}")
-    rows= cursor.fetchall()
-    combos= [eval(r[0]) for r in rows]
-    coverage= heuristic_3sur5(combos)
-    ratio= (len(coverage)/ len(combos))*100 if combos else 0
-    cursor.execute("DELETE FROM Heuristique3sur5")
-    data= [(str(c),) for c in coverage]
-    cursor.executemany("INSERT INTO Heuristique3sur5(boules) VALUES(?)", data)
-    conn.commit()
-    print(f"Heuristique3sur5 => {len(coverage)} combos ({ratio:.2f}%).")
+    cursor.execute("SELECT bitmask FROM Historique ORDER BY id")
+    historique= [r[0] for r in cursor.fetchall()]
+    charge= charger_bitmaps_filtres(conn, [])
+    if charge is not None:
+        rangs= rangs_depuis_bitmap(charge[0])
+    else:
+        cursor.execute("SELECT id FROM Combinaisons_Filtrees ORDER BY id")
+        rangs= np.array([r[0] for r in cursor.fetchall()], dtype=np.int64)
+    t= time.time()
+    calibrage= calibrer_filtres(historique)
+    ordre= ordre_filtres(calibrage)
+    retenus, evaluations= extraire_court_circuit(rangs, thr, historique, ordre)
+    duree= time.time()-t
+    _ecrire_extraites(conn, retenus)
+    print(rapport_court_circuit(len(rangs), calibrage, ordre, evaluations, len(retenus), duree))
+    ratio= (len(retenus)/len(rangs))*100 if len(rangs) else 0
+    print(f"Extraction (court-circuit) => {len(retenus)} combos ({ratio:.2f}%) vers CombinaisonsExtraites.")
+    return "CombinaisonsExtraites"
+
+def rangs_au_moins_k(conn, k, filtres=None):
+    """
+    (rangs triés des combinaisons présentes qui passent au moins k des 'filtres',
+     nb de combinaisons présentes), calculés sur les bitmaps persistants.
+    'filtres' vaut par défaut les 13. None si la base n'a pas de bitmaps complets.
+    """
+    filtres= filtres or ORDRE_FILTRES
+    charge= charger_bitmaps_filtres(conn, filtres)
+    if charge is None:
+        return None
+    presence, bms= charge
+    res= bitmap_et(presence, au_moins_k([bms[f] for f in filtres], k))
+    return rangs_depuis_bitmap(res), bitmap_compte(presence)
 
-def apply_heuristique_2sur5(conn, table_name="Heuristique3sur5"):
+def _colonne_rang(conn, table_name):
+    """
+    Colonne qui porte le rang combinatoire de 'table_name' : 'rang', ou 'id'
+    pour Combinaisons_Filtrees / Combinaisons_Flags (id = rang), sinon None.
+    """
+    colonnes= [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})").fetchall()]
+    if "rang" in colonnes:
+        return "rang"
+    if "id" in colonnes and table_name in ("Combinaisons_Filtrees", "Combinaisons_Flags"):
+        return "id"
+    return None
+
+def read_combos(conn, table_name):
+    """
+    Lit les 5 colonnes boule* d'une table => liste de tuples.
+    Avec l'univers binaire, seul le rang est lu et les boules viennent du memmap.
+    """
+    cursor= conn.cursor()
+    col= _colonne_rang(conn, table_name)
+    if col and UNIVERS_BINAIRE and ouvrir_univers() is not None:
+        cursor.execute(f"SELECT {col} FROM {table_name}")
+        rangs= [r[0] for r in cursor.fetchall()]
+        if None not in rangs:
+            return [tuple(c) for c in lot_rangs(rangs)[0].tolist()]
+    cursor.execute(f"SELECT {COLS_BOULES} FROM {table_name}")
+    return cursor.fetchall()
+
+def read_combos_np(conn, table_name):
+    """
+    (boules (n,5), bitmasks (n,)) d'une table, triés dans l'ordre lexicographique
+    (= ordre des rangs), sans passer par des tuples python.
+    """
     cursor= conn.cursor()
-    cursor.execute(f"SELECT boules FROM {table_name}")
-    rows= cursor.fetchall()
-    combos= [eval(r[0]) for r in rows]
-    coverage= heuristic_2sur5(combos)
-    ratio= (len(coverage)/ len(combos))*100 if combos else 0
-    cursor.execute("DELETE FROM Heuristique2sur5")
-    data= [(str(c),) for c in coverage]
-    cursor.executemany("INSERT INTO Heuristique2sur5(boules) VALUES(?)", data)
+    col= _colonne_rang(conn, table_name)
+    if col and UNIVERS_BINAIRE and ouvrir_univers() is not None:
+        cursor.execute(f"SELECT {col} FROM {table_name} ORDER BY {col}")
+        rangs= [r[0] for r in cursor.fetchall()]
+        if None not in rangs:
+            return lot_rangs(rangs)
+    cursor.execute(f"SELECT {COLS_BOULES} FROM {table_name} ORDER BY {COLS_BOULES}")
+    arr= np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 5)
+    return arr, boules_to_bitmask_batch(arr)
+
+def write_combos(conn, table_name, combos, commit=True):
+    """
+    Vide 'table_name' puis y insère les combinaisons (rang, 5 boules, bitmask).
+    commit=False : l'appelant valide la transaction (plusieurs tables d'un coup).
+    """
+    cursor= conn.cursor()
+    cursor.execute(f"DELETE FROM {table_name}")
+    if len(combos):
+        rangs= rank_batch(np.array(combos, dtype=np.int64))
+        arr, masks= lot_rangs(rangs)
+        data= np.column_stack([rangs, arr, masks.astype(np.int64)]).tolist()
+    else:
+        data= []
+    cursor.executemany(f"""
+      INSERT INTO {table_name}(rang, {COLS_BOULES}, bitmask)
+      VALUES(?,?,?,?,?,?,?)
+    """, data)
+    if commit:
+        conn.commit()
+
+def _leaders_partition(args):
+    """
+    Tâche d'un processus : leaders d'une partition (indices globaux).
+    """
+    masks, seuil, debut= args
+    return heuristic_leaders(masks, seuil) + debut
+
+def heuristic_leaders_parallele(masks, seuil, nb_workers=None, stats=None):
+    """
+    heuristic_leaders réparti sur un pool de processus (NB_WORKERS) : les bitmasks
+    triés sont découpés en plages de rangs contiguës (~4 par processus, au moins
+    10000 combos chacune), chaque plage est réduite indépendamment, puis
+    raccorder_leaders recalcule la chaîne aux frontières.
+    Résultat identique à la version série.
+    'stats' (dict) reçoit le nombre de partitions et de leaders recalculés.
+    """
+    if nb_workers is None:
+        nb_workers= NB_WORKERS
+    n= len(masks)
+    nb_parts= min(nb_workers*4, n//10000)
+    if stats is None:
+        stats= {}
+    stats.update(partitions=1, recalcules=0)
+    if nb_workers<=1 or nb_parts<=1:
+        return heuristic_leaders(masks, seuil)
+    bornes= np.unique(np.linspace(0, n, nb_parts+1).astype(np.int64))
+    taches= [(masks[bornes[p]:bornes[p+1]], seuil, int(bornes[p])) for p in range(len(bornes)-1)]
+    with ProcessPoolExecutor(max_workers=nb_workers) as pool:
+        locaux= list(pool.map(_leaders_partition, taches))
+    leaders, recalcules= raccorder_leaders(masks, seuil, bornes, locaux)
+    stats.update(partitions=len(taches), recalcules=recalcules)
+    return leaders
+
+def _reduire(arr, masks, seuil, couverture=False):
+    """
+    Indices (croissants) des tickets retenus parmi arr trié : heuristique
+    'seuil' sur 5 (en parallèle au-delà de CHUNK_SIZE_SCAN combos)
+    ou couverture gloutonne.
+    """
+    if couverture:
+        return np.sort(couverture_gloutonne(arr, seuil))
+    if NB_WORKERS>1 and len(masks)>CHUNK_SIZE_SCAN:
+        return heuristic_leaders_parallele(masks, seuil)
+    return heuristic_leaders(masks, seuil)
+
+def apply_heuristique(conn, table_name, table_dest, seuil, couverture=False):
+    """
+    Heuristique 'seuil' sur 5 (heuristic_leaders sur les bitmasks triés,
+    même couverture que heuristic_4sur5/3sur5/2sur5) : table_name => table_dest.
+    couverture=True : couverture gloutonne (couverture.py), chaque combo de
+    table_name partage au moins 'seuil' boules avec un ticket de table_dest.
+    """
+    arr, masks= read_combos_np(conn, table_name)
+    coverage= arr[_reduire(arr, masks, seuil, couverture)]
+    ratio= (len(coverage)/ len(arr))*100 if len(arr) else 0
+    write_combos(conn, table_dest, coverage)
+    print(f"{table_dest} => {len(coverage)} combos ({ratio:.2f}%).")
+
+def apply_heuristique_4sur5(conn, table_name="CombinaisonsExtraites", couverture=False):
+    """
+    Applique la fonction heuristic_4sur5 => coverage
+    """
+    cursor= conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+    print(f"Itération 1, combos restant={cursor.fetchone()[0]}")
+    apply_heuristique(conn, table_name, "Heuristique4sur5", 4, couverture)
+
+def apply_heuristique_3sur5(conn, table_name="Heuristique4sur5", couverture=False):
+    apply_heuristique(conn, table_name, "Heuristique3sur5", 3, couverture)
+
+def apply_heuristique_2sur5(conn, table_name="Heuristique3sur5", couverture=False):
+    apply_heuristique(conn, table_name, "Heuristique2sur5", 2, couverture)
+
+def pipeline_heuristiques(conn, table_name="CombinaisonsExtraites", seuils=(4, 3, 2),
+                          couverture=False, persister=None, verifier=False):
+    """
+    Enchaîne les heuristiques (4sur5 => 3sur5 => 2sur5) en mémoire : table_name
+    est lue une fois, chaque étape réduit les tableaux numpy (boules, bitmasks)
+    de l'étape précédente. Seules les tables Heuristique{k}sur5 des seuils de
+    'persister' (défaut : la dernière étape) sont écrites, en une transaction ;
+    les autres tables de la chaîne sont vidées (pas de résultat périmé).
+    verifier=True : rapport_couverture de chaque étape sur les tableaux en mémoire.
+    Renvoie {seuil: boules (n,5)}.
+    """
+    persister= set(persister) if persister is not None else {seuils[-1]}
+    t= time.time()
+    arr, masks= read_combos_np(conn, table_name)
+    source= arr
+    print(f"\n[Pipeline heuristiques {' => '.join(f'{k}sur5' for k in seuils)}]")
+    print(f"  Lecture {table_name} : {len(arr)} combos ({time.time()-t:.2f} s)")
+    depart= len(arr)
+    resultats= {}
+    for k in seuils:
+        t= time.time()
+        n= len(arr)
+        idx= _reduire(arr, masks, k, couverture)
+        arr, masks= arr[idx], masks[idx]
+        resultats[k]= arr
+        print(f"  {k}sur5 : {n} => {len(arr)} combos ({(len(arr)/n)*100 if n else 0:.2f}% de l'étape, "
+              f"{(len(arr)/depart)*100 if depart else 0:.2f}% du départ), {time.time()-t:.2f} s")
+    t= time.time()
+    for k in seuils:
+        write_combos(conn, f"Heuristique{k}sur5", resultats[k] if k in persister else [], commit=False)
     conn.commit()
-    print(f"Heuristique2sur5 => {len(coverage)} combos ({ratio:.2f}%).")
+    print(f"  Écriture {', '.join(f'Heuristique{k}sur5' for k in seuils if k in persister)} : "
+          f"{time.time()-t:.2f} s")
+    if verifier:
+        etapes= [(table_name, source)] + [(f"{k}sur5", resultats[k]) for k in seuils]
+        for (nom_s, s), (nom_t, tk), k in zip(etapes, etapes[1:], seuils):
+            rapport_couverture(s, tk, nom_s, nom_t, k)
+    return resultats
+
+def comparer_heuristique_parallele(conn, table_name="CombinaisonsExtraites", seuil=4, nb_workers=None):
+    """
+    Heuristique 'seuil' sur 5 de table_name en série puis en parallèle :
+    durées, accélération, taille des résultats et écart éventuel.
+    """
+    if nb_workers is None:
+        nb_workers= NB_WORKERS
+    _, masks= read_combos_np(conn, table_name)
+    t= time.time()
+    serie= heuristic_leaders(masks, seuil)
+    d_serie= time.time()-t
+    stats= {}
+    t= time.time()
+    para= heuristic_leaders_parallele(masks, seuil, nb_workers, stats)
+    d_para= time.time()-t
+    print(f"\n[Heuristique {seuil}sur5 sur {table_name} ({len(masks)} combos)]")
+    print(f"  Série     : {len(serie)} combos, {d_serie:.2f} s")
+    print(f"  Parallèle : {len(para)} combos, {d_para:.2f} s ({nb_workers} processus, "
+          f"{stats['partitions']} partitions, {stats['recalcules']} leaders recalculés aux frontières)")
+    print(f"  Accélération x{(d_serie/d_para) if d_para else 0:.2f}, écart de taille {len(para)-len(serie):+d}, "
+          f"résultat {'identique' if np.array_equal(serie, para) else 'DIFFÉRENT'}")
+
+def rapport_couverture(source, tickets, nom_source, nom_tickets, seuil, nb_exemples=10):
+    """
+    Recouvrement maximal de chaque combo de source (n,5) par les tickets :
+    histogramme 0..5 et combos couvertes à moins de 'seuil'.
+    Renvoie les combos non couvertes (n,5).
+    """
+    t= time.time()
+    meilleur= meilleur_recouvrement(source, tickets)
+    histo= np.bincount(meilleur, minlength=6)
+    non_couvertes= source[meilleur < seuil]
+    print(f"\n[Couverture {nom_source} ({len(source)}) par {nom_tickets} ({len(tickets)}), "
+          f"{time.time()-t:.1f} s]")
+    for k in range(6):
+        pct= (histo[k]/ len(source))*100 if len(source) else 0
+        print(f"  meilleur recouvrement {k}/5 : {histo[k]:>9} ({pct:6.2f}%)")
+    print(f"  Non couvertes (< {seuil}/5) : {len(non_couvertes)}")
+    for c in non_couvertes[:nb_exemples]:
+        print(f"    {tuple(int(x) for x in c)}")
+    return non_couvertes
+
+def verifier_couverture(conn, table_source, table_tickets, seuil, nb_exemples=10):
+    """
+    rapport_couverture de table_source par table_tickets ; ignorée si l'une
+    des deux tables est vide (étape non appliquée ou non conservée).
+    """
+    source, _= read_combos_np(conn, table_source)
+    tickets, _= read_combos_np(conn, table_tickets)
+    if not len(source) or not len(tickets):
+        print(f"\n[Couverture {table_source} par {table_tickets} : table vide, vérification ignorée]")
+        return None
+    return rapport_couverture(source, tickets, table_source, table_tickets, seuil, nb_exemples)
 
 def final_tables_summary(conn):
     cursor= conn.cursor()
@@ -906,10 +1913,7 @@ def random_draw_from_table(conn):
     except:
         print("Invalide.")
         return
-    cursor= conn.cursor()
-    cursor.execute(f"SELECT boules FROM {tab}")
-    rows= cursor.fetchall()
-    combos= [r[0] for r in rows]
+    combos= read_combos(conn, tab)
     if not combos:
         print(f"Aucune combinaison dans {tab}.")
         return